@@ -1,11 +1,39 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, has_app_context, has_request_context, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.exc import SQLAlchemyError
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Engine, UpdateBase, case, cast, create_engine, event, func, insert, inspect, literal, select, union_all, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import OperationalError, SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.pool import QueuePool
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from werkzeug.security import check_password_hash, generate_password_hash
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
 from dotenv import load_dotenv
 import os
+import atexit
+import bisect
+import click
+import cProfile
+import csv
 import hashlib
+import heapq
+import hmac
+import io
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional
+    msgpack = None
 
 # Load environment variables from parent directory or current directory
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -17,41 +45,482 @@ USER = os.getenv("DB_USER")
 PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"mysql+pymysql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB_NAME}"
+# DATABASE_URL overrides the Railway settings (e.g. sqlite:///primary.db for local testing)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB_NAME}"
+
+# Optional read replicas, comma separated. GET requests are served from these.
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_BIND_KEYS = [f"replica_{i}" for i in range(len(REPLICA_URLS))]
+# After a write, that client's reads stay on the primary for this long. Writes return the
+# deadline in this header and the client sends it back on later requests.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+PRIMARY_PIN_HEADER = "X-Primary-Until"
+# Replicas further behind than this (or unreachable) are skipped until the next check
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "10"))
+
+# Multi-campus tenancy: each tenant (university) gets its own database.
+# TENANT_DATABASE_URLS is a JSON object {"tenant": "url"}; TENANT_DATABASE_URL_TEMPLATE
+# builds a URL for the tenants listed in TENANTS, e.g. "sqlite:////data/tenants/{tenant}.db".
+# Tenant names are lowercased to match how requests resolve them.
+TENANT_DATABASE_URLS = {name.strip().lower(): url
+                        for name, url in json.loads(os.getenv("TENANT_DATABASE_URLS") or "{}").items()}
+TENANT_DATABASE_URL_TEMPLATE = os.getenv("TENANT_DATABASE_URL_TEMPLATE")
+TENANTS = {name.strip().lower() for name in os.getenv("TENANTS", "").split(",") if name.strip()}
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant")
+TENANT_BASE_DOMAIN = os.getenv("TENANT_BASE_DOMAIN")  # "<tenant>.<base domain>" hosts
+TENANT_IDLE_SECONDS = float(os.getenv("TENANT_IDLE_SECONDS", "600"))
+TENANCY_ENABLED = bool(TENANT_DATABASE_URLS or TENANT_DATABASE_URL_TEMPLATE)
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "hello")
 
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
+app.config["SQLALCHEMY_BINDS"] = dict(zip(REPLICA_BIND_KEYS, REPLICA_URLS))
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_size": 10,
-    "pool_recycle": 3600,
-    "pool_pre_ping": True,
-}
+# Connection pool sizing, tunable per deployment (see GET /api/metrics/pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 app.permanent_session_lifetime = timedelta(minutes=30)
 
+# Rows fetched per round trip when streaming exports from a server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Read messages older than this are moved out of the hot `messages` table
+MESSAGE_ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "180"))
+MESSAGE_ARCHIVE_BATCH_SIZE = int(os.getenv("MESSAGE_ARCHIVE_BATCH_SIZE", "500"))
+# Characters of the latest message shown per sender in the inbox summary
+MESSAGE_PREVIEW_LENGTH = 120
+
+# Club activity (views, bookmarks, joins) is counted in memory and flushed in batches
+ACTIVITY_BUCKET_SECONDS = int(os.getenv("ACTIVITY_BUCKET_SECONDS", "3600"))
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", "5"))
+TRENDING_WINDOW_DAYS = int(os.getenv("TRENDING_WINDOW_DAYS", "7"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_CACHE_SECONDS = float(os.getenv("TRENDING_CACHE_SECONDS", "60"))
+TRENDING_WEIGHTS = {"views": 1, "bookmarks": 5, "joins": 10}
+TRENDING_MAX_RESULTS = 50
+
+# Autocomplete indexes are rebuilt from the database this often, to pick up
+# clubs registered or edited through other worker processes
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "300"))
+AUTOCOMPLETE_MAX_RESULTS = 20
+
+# Password hashing runs on a bounded pool so slow hashes can't tie up every request thread.
+# Logins beyond HASH_WORKERS + HASH_QUEUE_LIMIT in flight get 503 instead of queueing.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 4)))
+
+# Per-request profiling (all off by default; see "Request Profiling" in API_DOCUMENTATION.md)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")  # send as X-Profile header
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of requests to cProfile
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))  # capture stack samples of slower requests
+PROFILE_SAMPLER_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLER_INTERVAL_MS", "5"))
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN or PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_MS > 0)
+
 # Enable CORS for React frontend
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:3000", "http://127.0.0.1:3000"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", TENANT_HEADER, PRIMARY_PIN_HEADER],
+        "expose_headers": [PRIMARY_PIN_HEADER],
         "supports_credentials": True
     }
 })
 
-db = SQLAlchemy(app)
+
+# ============== CONNECTION POOL TELEMETRY ==============
+
+class PoolTelemetry:
+    """Counters and histograms for one engine's connection pool"""
+
+    # Upper bounds (seconds) of the checkout-wait and pre-ping histograms
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.wait = self._histogram()
+        self.ping = self._histogram()
+        self.timeouts = 0
+        self.ping_failures = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+
+    def _histogram(self):
+        return {"buckets": [0] * (len(self.BUCKETS) + 1), "count": 0, "sum": 0.0}
+
+    def _observe(self, histogram, seconds):
+        index = next((i for i, bound in enumerate(self.BUCKETS) if seconds <= bound), len(self.BUCKETS))
+        with self._lock:
+            histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+
+    def observe_wait(self, seconds, timed_out=False):
+        self._observe(self.wait, seconds)
+        if timed_out:
+            with self._lock:
+                self.timeouts += 1
+
+    def observe_ping(self, seconds, ok):
+        self._observe(self.ping, seconds)
+        if not ok:
+            with self._lock:
+                self.ping_failures += 1
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def observe_checkout(self):
+        checked_out = self.engine.pool.checkedout()
+        with self._lock:
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self._lock:
+            data = {
+                "poolSize": pool.size() if hasattr(pool, "size") else None,
+                "checkedOut": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "checkedIn": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "peakCheckedOut": self.peak_checked_out,
+                "checkoutTimeouts": self.timeouts,
+                "connectionsOpened": self.connects,
+                "connectionsClosed": self.closes,
+                "connectionsInvalidated": self.invalidations,
+                "prePingFailures": self.ping_failures,
+            }
+            for name, histogram in (("checkoutWait", self.wait), ("prePing", self.ping)):
+                data[name] = {
+                    "count": histogram["count"],
+                    "sumSeconds": round(histogram["sum"], 6),
+                    "buckets": dict(zip([str(b) for b in self.BUCKETS] + ["+Inf"], histogram["buckets"])),
+                }
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    telemetry = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            if self.telemetry:
+                self.telemetry.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.telemetry:
+            self.telemetry.observe_wait(time.perf_counter() - start)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+pool_telemetry = {}  # label -> PoolTelemetry
+
+
+def instrument_engine(engine, label):
+    """Attach pool telemetry to an engine and register it under `label`"""
+    telemetry = PoolTelemetry(engine)
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.telemetry = telemetry
+
+    event.listen(engine, "connect", lambda *args: telemetry.count("connects"))
+    event.listen(engine, "close", lambda *args: telemetry.count("closes"))
+    event.listen(engine, "invalidate", lambda *args: telemetry.count("invalidations"))
+    event.listen(engine, "checkout", lambda *args: telemetry.observe_checkout())
+
+    do_ping = engine.dialect.do_ping
+
+    def timed_ping(dbapi_connection):
+        start = time.perf_counter()
+        ok = False
+        try:
+            ok = do_ping(dbapi_connection)
+            return ok
+        finally:
+            telemetry.observe_ping(time.perf_counter() - start, ok)
+
+    engine.dialect.do_ping = timed_ping
+    pool_telemetry[label] = telemetry
+    return telemetry
+
+
+def pool_metrics_prometheus():
+    """Render pool telemetry in the Prometheus text exposition format"""
+    lines = []
+    gauges = [("checkedOut", "db_pool_checked_out"), ("overflow", "db_pool_overflow"),
+              ("poolSize", "db_pool_size"), ("peakCheckedOut", "db_pool_peak_checked_out")]
+    counters = [("checkoutTimeouts", "db_pool_checkout_timeouts_total"),
+                ("connectionsOpened", "db_pool_connections_opened_total"),
+                ("connectionsClosed", "db_pool_connections_closed_total"),
+                ("connectionsInvalidated", "db_pool_connections_invalidated_total"),
+                ("prePingFailures", "db_pool_pre_ping_failures_total")]
+    histograms = [("checkoutWait", "db_pool_checkout_wait_seconds"), ("prePing", "db_pool_pre_ping_seconds")]
+    snapshots = {label: telemetry.snapshot() for label, telemetry in pool_telemetry.items()}
+
+    for key, metric in gauges + counters:
+        lines.append(f"# TYPE {metric} {'gauge' if (key, metric) in gauges else 'counter'}")
+        for label, data in snapshots.items():
+            if data[key] is not None:
+                lines.append(f'{metric}{{engine="{label}"}} {data[key]}')
+    for key, metric in histograms:
+        lines.append(f"# TYPE {metric} histogram")
+        for label, data in snapshots.items():
+            cumulative = 0
+            for bound, count in data[key]["buckets"].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{engine="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{engine="{label}"}} {data[key]["sumSeconds"]}')
+            lines.append(f'{metric}_count{{engine="{label}"}} {data[key]["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "poolclass": InstrumentedQueuePool,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+
+# ============== READ REPLICA ROUTING ==============
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas, re-checking each one's lag periodically"""
+
+    def __init__(self, bind_keys):
+        self.bind_keys = bind_keys
+        self._health = {key: (0.0, True) for key in bind_keys}  # key -> (checked_at, healthy)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """Return the bind key of a usable replica, or None to use the primary"""
+        for _ in range(len(self.bind_keys)):
+            with self._lock:
+                key = self.bind_keys[self._next % len(self.bind_keys)]
+                self._next += 1
+            if self.is_healthy(key):
+                return key
+        return None
+
+    def is_healthy(self, key):
+        checked_at, healthy = self._health[key]
+        if time.monotonic() - checked_at >= REPLICA_CHECK_INTERVAL:
+            healthy = self._probe(db.engines[key])
+            self._health[key] = (time.monotonic(), healthy)
+        return healthy
+
+    def mark_down(self, key):
+        self._health[key] = (time.monotonic(), False)
+
+    def _probe(self, engine):
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name != "mysql":
+                    conn.exec_driver_sql("SELECT 1")
+                    return True
+                try:
+                    status = conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+                    lag_column = "Seconds_Behind_Source"
+                except OperationalError:  # MySQL < 8.0.22
+                    status = conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+                    lag_column = "Seconds_Behind_Master"
+                if status is None:
+                    return True  # a plain server, not replicating from anything
+                lag = status.get(lag_column)
+                return lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+        except SQLAlchemyError:
+            return False
+
+
+replica_router = ReplicaRouter(REPLICA_BIND_KEYS)
+
+
+class RoutingSession(Session):
+    """Sends reads to the replica picked for this request; writes always go to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        tenant_engine = g.get("tenant_engine") if has_app_context() else None
+        if tenant_engine is not None and bind is None:
+            return tenant_engine
+        replica_key = g.get("replica_bind") if has_request_context() else None
+        if (replica_key and bind is None and not self._flushing
+                and not isinstance(clause, UpdateBase)):
+            return db.engines[replica_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+
+
+@app.before_request
+def choose_read_replica():
+    """Serve safe requests from a replica unless this client wrote recently"""
+    if not REPLICA_BIND_KEYS or request.method not in ("GET", "HEAD") or g.get("tenant"):
+        return
+    if pinned_to_primary():
+        return
+    g.replica_bind = replica_router.choose()
+
+
+def pinned_to_primary():
+    """True while the X-Primary-Until deadline sent back by the client hasn't passed"""
+    try:
+        until = float(request.headers.get(PRIMARY_PIN_HEADER, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    # Deadlines further out than any write could have set are ignored
+    return now < until <= now + READ_YOUR_WRITES_SECONDS + 1
+
+
+@app.after_request
+def stick_to_primary_after_write(response):
+    """Pin this client's reads to the primary briefly so it sees its own writes"""
+    if REPLICA_BIND_KEYS and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.headers[PRIMARY_PIN_HEADER] = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+    return response
+
+
+@app.errorhandler(OperationalError)
+def retry_read_on_primary(error):
+    """If a replica fails mid-request, take it out of rotation and rerun the read on the primary"""
+    replica_key = g.pop("replica_bind", None)
+    db.session.rollback()
+    if replica_key is None:
+        return jsonify({"error": "Database unavailable"}), 503
+    replica_router.mark_down(replica_key)
+    return app.view_functions[request.endpoint](**request.view_args)
+
 
 # Manual CORS handling
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', f'Content-Type,Authorization,{TENANT_HEADER},{PRIMARY_PIN_HEADER}')
+    response.headers.add('Access-Control-Expose-Headers', PRIMARY_PIN_HEADER)
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
 
+# ============== MULTI-CAMPUS TENANCY ==============
+
+TENANT_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,62}")
+
+
+class TenantEngineRegistry:
+    """Lazily created engine per tenant; engines idle for TENANT_IDLE_SECONDS are disposed"""
+
+    def __init__(self):
+        self._engines = {}  # tenant -> [engine, last used]
+        self._creating = {}  # tenant -> lock held while its engine is set up
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def url_for(self, tenant):
+        """Database URL of a configured tenant, None for anything else"""
+        if tenant in TENANT_DATABASE_URLS:
+            return TENANT_DATABASE_URLS[tenant]
+        if TENANT_DATABASE_URL_TEMPLATE and tenant in TENANTS:
+            return TENANT_DATABASE_URL_TEMPLATE.format(tenant=tenant)
+        return None
+
+    def get(self, tenant):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._engines.get(tenant)
+            if entry is None:
+                creating = self._creating.setdefault(tenant, threading.Lock())
+        if entry is None:
+            # Set up outside the registry lock so a new tenant doesn't stall the others;
+            # the per-tenant lock makes concurrent first requests share one engine
+            with creating:
+                with self._lock:
+                    entry = self._engines.get(tenant)
+                if entry is None:
+                    url = self.url_for(tenant)
+                    if url is None:
+                        raise LookupError(f"Unknown tenant: {tenant}")
+                    engine = create_engine(url, **app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+                    try:
+                        instrument_engine(engine, f"tenant:{tenant}")
+                        prepare_database(engine)
+                    except Exception:
+                        # Leave nothing behind so the next request retries from scratch
+                        engine.dispose()
+                        pool_telemetry.pop(f"tenant:{tenant}", None)
+                        raise
+                    with self._lock:
+                        entry = self._engines[tenant] = [engine, now]
+                        self._creating.pop(tenant, None)
+        entry[1] = now
+        if now - self._last_sweep > min(TENANT_IDLE_SECONDS, 60):
+            self.evict_idle(now)
+        return entry[0]
+
+    def evict_idle(self, now=None):
+        now = now or time.monotonic()
+        self._last_sweep = now
+        with self._lock:
+            idle = [tenant for tenant, (engine, last_used) in self._engines.items()
+                    if now - last_used > TENANT_IDLE_SECONDS and engine.pool.checkedout() == 0]
+            for tenant in idle:
+                engine, _ = self._engines.pop(tenant)
+                engine.dispose()
+                pool_telemetry.pop(f"tenant:{tenant}", None)
+        return idle
+
+    def active_tenants(self):
+        with self._lock:
+            return sorted(self._engines)
+
+
+tenant_registry = TenantEngineRegistry()
+
+
+def resolve_tenant():
+    """Pick the tenant from the X-Tenant header or the request's subdomain"""
+    tenant = request.headers.get(TENANT_HEADER)
+    if not tenant and TENANT_BASE_DOMAIN:
+        host = request.host.split(":")[0].lower()
+        if host.endswith("." + TENANT_BASE_DOMAIN):
+            tenant = host[:-len(TENANT_BASE_DOMAIN) - 1]
+    if not tenant:
+        return  # no tenant: the default database
+    tenant = tenant.lower()
+    if not TENANT_NAME.fullmatch(tenant) or tenant_registry.url_for(tenant) is None:
+        return jsonify({"error": "Unknown tenant"}), 404
+    g.tenant = tenant
+    g.tenant_engine = tenant_registry.get(tenant)
+
+
+if TENANCY_ENABLED:
+    # Runs ahead of choose_read_replica, which leaves tenant requests alone
+    app.before_request_funcs.setdefault(None, []).insert(0, resolve_tenant)
+
+
 # ============== DATABASE MODELS ==============
 
 # [1] User Authentication - Two types: Student and Club
@@ -106,6 +575,26 @@ class club_users(db.Model):
         }
 
 
+# One row per login email and account type, so login is a single indexed lookup.
+# New signups can't reuse an email, but older databases may have a student and a
+# club user sharing one; both get a row. passwordHash is kept in sync with
+# students.password / club_users.password.
+class credentials(db.Model):
+    __tablename__ = "credentials"
+    __table_args__ = (db.UniqueConstraint('email', 'accountType', name='unique_credential_email_type'),)
+
+    credentialID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    email = db.Column(db.String(100), nullable=False, index=True)
+    accountType = db.Column(db.String(10), nullable=False)  # "student" or "club"
+    accountID = db.Column(db.String(20), nullable=False)  # studentID or clubUserID
+    passwordHash = db.Column(db.String(255), nullable=False)
+
+    def account(self):
+        if self.accountType == "student":
+            return db.session.get(students, self.accountID)
+        return db.session.get(club_users, int(self.accountID))
+
+
 # [2] Club Information
 class clubs(db.Model):
     __tablename__ = "clubs"
@@ -116,6 +605,9 @@ class clubs(db.Model):
     category = db.Column(db.String(50), nullable=False)  # Sport, Culture, Academic, Volunteer, etc.
     meetingTime = db.Column(db.String(50), nullable=False)
     meetingLocation = db.Column(db.String(100), nullable=False)
+    # Change tracking for /api/sync (set by stamp_row_versions)
+    updatedAt = db.Column(db.DateTime, nullable=True)
+    rowVersion = db.Column(db.BigInteger, nullable=False, default=0, server_default="0", index=True)
 
     # Relationships
     events = db.relationship('events', backref='club', cascade='all, delete-orphan')
@@ -123,6 +615,8 @@ class clubs(db.Model):
     messages = db.relationship('messages', backref='club', cascade='all, delete-orphan')
     members = db.relationship('club_members', backref='club', cascade='all, delete-orphan')
     bookmarks = db.relationship('bookmarks', backref='club', cascade='all, delete-orphan')
+    series = db.relationship('event_series', backref='club', cascade='all, delete-orphan')
+    activity = db.relationship('club_activity', cascade='all, delete-orphan')
 
     def to_dict(self, include_stats=False):
         data = {
@@ -155,6 +649,26 @@ class events(db.Model):
     eventTime = db.Column(db.String(50), nullable=False)
     eventLocation = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(255), nullable=False)
+    # eventTime parsed into a time range for conflict detection (NULL if unparseable)
+    startTime = db.Column(db.Time, nullable=True)
+    endTime = db.Column(db.Time, nullable=True)
+    # eventLocation trimmed and casefolded, so "Gym A" and "gym a " are the same room everywhere
+    locationKey = db.Column(db.String(100), nullable=True)
+    updatedAt = db.Column(db.DateTime, nullable=True)
+    rowVersion = db.Column(db.BigInteger, nullable=False, default=0, server_default="0", index=True)
+
+    # Interval lookups per room and day: seek to (location, date) and scan by start time
+    __table_args__ = (db.Index('ix_events_location_key_date_start', 'locationKey', 'eventDate', 'startTime'),)
+
+    @db.validates("eventTime")
+    def parse_event_time(self, key, value):
+        self.startTime, self.endTime = parse_time_range(value)
+        return value
+
+    @db.validates("eventLocation")
+    def normalize_location(self, key, value):
+        self.locationKey = location_key(value)
+        return value
 
     def to_dict(self):
         return {
@@ -172,6 +686,68 @@ class events(db.Model):
         }
 
 
+# Recurring events (e.g. weekly meetings), expanded per requested date window
+class event_series(db.Model):
+    __tablename__ = "event_series"
+
+    seriesID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    clubID = db.Column(db.Integer, db.ForeignKey('clubs.clubID'), nullable=False, index=True)
+    frequency = db.Column(db.String(10), nullable=False, default="weekly")  # 'daily' or 'weekly'
+    interval = db.Column(db.Integer, nullable=False, default=1)  # every N days/weeks
+    byDay = db.Column(db.String(30), nullable=True)  # weekly only, e.g. "TU,TH"
+    startDate = db.Column(db.Date, nullable=False)
+    untilDate = db.Column(db.Date, nullable=True)  # open-ended if NULL
+    eventTime = db.Column(db.String(50), nullable=False)
+    eventLocation = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.String(255), nullable=False)
+
+    exceptions = db.relationship('event_exceptions', backref='series', cascade='all, delete-orphan')
+
+    def to_dict(self):
+        return {
+            "seriesID": self.seriesID,
+            "clubID": self.clubID,
+            "clubName": self.club.clubName,
+            "frequency": self.frequency,
+            "interval": self.interval,
+            "byDay": self.byDay.split(",") if self.byDay else [],
+            "startDate": self.startDate.isoformat(),
+            "untilDate": self.untilDate.isoformat() if self.untilDate else None,
+            "eventTime": self.eventTime,
+            "eventLocation": self.eventLocation,
+            "description": self.description
+        }
+
+
+# A cancelled or moved occurrence of a series
+class event_exceptions(db.Model):
+    __tablename__ = "event_exceptions"
+
+    exceptionID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    seriesID = db.Column(db.Integer, db.ForeignKey('event_series.seriesID'), nullable=False)
+    occurrenceDate = db.Column(db.Date, nullable=False)  # the date the rule would have produced
+    status = db.Column(db.String(20), nullable=False)  # 'cancelled' or 'moved'
+    newDate = db.Column(db.Date, nullable=True)
+    newTime = db.Column(db.String(50), nullable=True)
+    newLocation = db.Column(db.String(100), nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('seriesID', 'occurrenceDate', name='unique_series_occurrence'),
+        db.Index('ix_event_exceptions_new_date', 'newDate'),
+    )
+
+    def to_dict(self):
+        return {
+            "exceptionID": self.exceptionID,
+            "seriesID": self.seriesID,
+            "occurrenceDate": self.occurrenceDate.isoformat(),
+            "status": self.status,
+            "newDate": self.newDate.isoformat() if self.newDate else None,
+            "newTime": self.newTime,
+            "newLocation": self.newLocation
+        }
+
+
 # [3] Media Posting System
 class media(db.Model):
     __tablename__ = "media"
@@ -182,6 +758,8 @@ class media(db.Model):
     mediaURL = db.Column(db.String(255), nullable=False)
     caption = db.Column(db.Text, nullable=True)
     uploadedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    updatedAt = db.Column(db.DateTime, nullable=True)
+    rowVersion = db.Column(db.BigInteger, nullable=False, default=0, server_default="0", index=True)
 
     def to_dict(self):
         return {
@@ -205,7 +783,10 @@ class messages(db.Model):
     subject = db.Column(db.String(200), nullable=True)
     messageText = db.Column(db.Text, nullable=False)
     isRead = db.Column(db.Boolean, default=False)
-    sentAt = db.Column(db.DateTime, default=datetime.utcnow)
+    sentAt = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Covers the per-sender partitioning of the inbox summary (/messages/summary)
+    __table_args__ = (db.Index('ix_messages_club_sender_sent', 'clubID', 'senderID', 'sentAt'),)
 
     def to_dict(self):
         return {
@@ -221,6 +802,43 @@ class messages(db.Model):
         }
 
 
+# Cold storage for old, read messages (see archive_messages)
+class messages_archive(db.Model):
+    __tablename__ = "messages_archive"
+
+    messageID = db.Column(db.Integer, primary_key=True, autoincrement=False)  # keeps the original ID
+    senderID = db.Column(db.String(20), db.ForeignKey('students.studentID'), nullable=False)
+    clubID = db.Column(db.Integer, db.ForeignKey('clubs.clubID'), nullable=False)
+    subject = db.Column(db.String(200), nullable=True)
+    messageText = db.Column(db.Text, nullable=False)
+    isRead = db.Column(db.Boolean, default=True)
+    sentAt = db.Column(db.DateTime)
+    archivedAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # No cascade from students/clubs here; archived rows are removed explicitly
+    sender = db.relationship('students')
+    club = db.relationship('clubs')
+
+    __table_args__ = (
+        db.Index('ix_messages_archive_club', 'clubID', 'messageID'),
+        db.Index('ix_messages_archive_sender', 'senderID', 'messageID'),
+    )
+
+    def to_dict(self):
+        return {
+            "messageID": self.messageID,
+            "senderID": self.senderID,
+            "senderName": f"{self.sender.firstName} {self.sender.lastName}",
+            "clubID": self.clubID,
+            "clubName": self.club.clubName,
+            "subject": self.subject,
+            "messageText": self.messageText,
+            "isRead": self.isRead,
+            "sentAt": self.sentAt.isoformat() if self.sentAt else None,
+            "archived": True
+        }
+
+
 # [6] Bookmark / Favorites Feature
 class bookmarks(db.Model):
     __tablename__ = "bookmarks"
@@ -243,6 +861,23 @@ class bookmarks(db.Model):
         }
 
 
+# Hourly (ACTIVITY_BUCKET_SECONDS) activity totals per club, written by ActivityCounters
+class club_activity(db.Model):
+    __tablename__ = "club_activity"
+
+    activityID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    clubID = db.Column(db.Integer, db.ForeignKey('clubs.clubID'), nullable=False)
+    bucketStart = db.Column(db.DateTime, nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    bookmarks = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    joins = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        db.UniqueConstraint('clubID', 'bucketStart', name='unique_club_activity_bucket'),
+        db.Index('ix_club_activity_bucket', 'bucketStart'),
+    )
+
+
 # Club Membership tracking
 class club_members(db.Model):
     __tablename__ = "club_members"
@@ -268,13 +903,953 @@ class club_members(db.Model):
         }
 
 
+# Delta sync bookkeeping
+class sync_state(db.Model):
+    __tablename__ = "sync_state"
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class sync_tombstones(db.Model):
+    __tablename__ = "sync_tombstones"
+
+    tombstoneID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    tableName = db.Column(db.String(50), nullable=False)
+    rowID = db.Column(db.Integer, nullable=False)
+    rowVersion = db.Column(db.BigInteger, nullable=False, index=True)
+    deletedAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Tables whose changes are served by /api/sync
+SYNCED_MODELS = {"clubs": clubs, "events": events, "media": media}
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def stamp_row_versions(session, flush_context, instances):
+    """Give every synced row written in this flush the next change version.
+
+    The counter row is bumped with an UPDATE, so it stays locked until commit
+    and versions become visible in order. Deletes leave a tombstone behind.
+    """
+    synced = tuple(SYNCED_MODELS.values())
+    changed = [obj for obj in session.new if isinstance(obj, synced)]
+    changed += [obj for obj in session.dirty if isinstance(obj, synced) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, synced)]
+    if not changed and not deleted:
+        return
+
+    session.execute(update(sync_state).where(sync_state.name == "sync").values(value=sync_state.value + 1))
+    version = session.execute(select(sync_state.value).where(sync_state.name == "sync")).scalar_one()
+    now = datetime.utcnow()
+
+    for obj in changed:
+        obj.rowVersion = version
+        obj.updatedAt = now
+    for obj in deleted:
+        session.add(sync_tombstones(
+            tableName=obj.__tablename__,
+            rowID=inspect(obj).identity[0],
+            rowVersion=version,
+            deletedAt=now
+        ))
+
+
 # ============== HELPER FUNCTIONS ==============
 
 def hash_password(password):
-    """Hash a password using SHA256"""
+    """Legacy SHA256 hash; still accepted at login and upgraded on success"""
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+LEGACY_HASH = re.compile(r"[0-9a-f]{64}")
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing worker and queue slot is taken"""
+
+
+class PasswordHasher:
+    """Runs password hashing on HASH_WORKERS threads with at most HASH_QUEUE_LIMIT waiting"""
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, method=PASSWORD_HASH_METHOD):
+        self.method = method
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._dummy_hash = None
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            return self._executor.submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        if LEGACY_HASH.fullmatch(stored_hash):
+            # A SHA256 check alone is far quicker than scrypt and would give away
+            # which accounts haven't been upgraded (or exist at all), so pay for both
+            self.verify_unknown(password)
+            return hmac.compare_digest(stored_hash, hash_password(password))
+        return self._run(check_password_hash, stored_hash, password)
+
+    def verify_unknown(self, password):
+        """Spend the same time as a real check, so unknown emails can't be told apart"""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(os.urandom(16).hex())
+        self._run(check_password_hash, self._dummy_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        # werkzeug hashes look like "scrypt:32768:8:1$salt$hash"; legacy ones are bare hex
+        return not stored_hash.split("$", 1)[0].startswith(self.method)
+
+
+password_hasher = PasswordHasher()
+
+
+@app.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    return jsonify({"error": "Server busy, please try again"}), 503, {"Retry-After": "1"}
+
+
+# Event length assumed when eventTime only gives a start ("5 PM")
+DEFAULT_EVENT_MINUTES = 60
+END_OF_DAY = dt_time(23, 59, 59)
+_TIME_PATTERN = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?\s*(?:m\.?)?", re.IGNORECASE)
+
+
+def _to_time(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return dt_time(hour, minute)
+
+
+def parse_time_range(text):
+    """Parse free-text event times like "5:00 PM - 7:00 PM", "5-7pm" or "17:00" into (start, end).
+
+    Returns (None, None) when the text can't be understood (e.g. "TBA").
+    """
+    parts = re.split(r"\s*(?:-|–|—|\bto\b)\s*", (text or "").strip(), maxsplit=1)
+    matches = [_TIME_PATTERN.fullmatch(part.strip()) for part in parts]
+    if not matches or not all(matches):
+        return None, None
+
+    start_m = matches[0]
+    end_m = matches[1] if len(matches) > 1 else None
+    # "5-7 PM": the start borrows the end's AM/PM
+    start_meridiem = start_m.group(3) or (end_m.group(3) if end_m else None)
+    start = _to_time(start_m.group(1), start_m.group(2), start_meridiem)
+    if start is None:
+        return None, None
+    if not start_m.group(3) and end_m and end_m.group(3) and end_m.group(3).lower() == "p":
+        # "11 - 1 PM" / "10-12 PM" cross noon: a borrowed PM that lands at or after the end means AM
+        end = _to_time(end_m.group(1), end_m.group(2), "p")
+        morning = _to_time(start_m.group(1), start_m.group(2), "a")
+        if end is not None and start >= end and morning is not None and morning < end:
+            start = morning
+
+    if end_m is None:
+        end_dt = datetime.combine(date.min, start) + timedelta(minutes=DEFAULT_EVENT_MINUTES)
+        end = end_dt.time() if end_dt.date() == date.min else END_OF_DAY
+    else:
+        end = _to_time(end_m.group(1), end_m.group(2), end_m.group(3) or start_meridiem)
+        if end is None:
+            return None, None
+        if end <= start:  # runs past midnight; clamp to the end of the day
+            end = END_OF_DAY
+    return start, end
+
+
+# How far ahead recurring events are expanded when no end_date is given
+RECURRENCE_WINDOW_DAYS = int(os.getenv("RECURRENCE_WINDOW_DAYS", "90"))
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+Occurrence = namedtuple("Occurrence", "seriesID occurrenceDate clubID clubName description "
+                                      "eventDate eventTime eventLocation")
+
+
+def series_dates(series, window_start, window_end):
+    """Yield the dates a series' rule produces within [window_start, window_end].
+
+    Jumps straight to the first period touching the window, so the work done
+    is proportional to the window length, not to how long the series has run.
+    """
+    first = max(series.startDate, window_start)
+    last = min(series.untilDate or window_end, window_end)
+    if first > last:
+        return
+    step = max(series.interval or 1, 1)
+
+    if series.frequency == "daily":
+        day = first + timedelta(days=-(first - series.startDate).days % step)
+        while day <= last:
+            yield day
+            day += timedelta(days=step)
+        return
+
+    weekdays = sorted(WEEKDAY_CODES.index(code) for code in series.byDay.split(",")) \
+        if series.byDay else [series.startDate.weekday()]
+    first_monday = series.startDate - timedelta(days=series.startDate.weekday())
+    week = (first - first_monday).days // 7
+    week -= week % step  # back up to the start of the current repeat cycle
+    while True:
+        monday = first_monday + timedelta(weeks=week)
+        if monday > last:
+            return
+        for weekday in weekdays:
+            day = monday + timedelta(days=weekday)
+            if first <= day <= last:
+                yield day
+        week += step
+
+
+def expand_series(series, exceptions, window_start, window_end):
+    """Yield a series' occurrences in the window, applying cancellations and moves.
+
+    `exceptions` maps occurrenceDate -> event_exceptions row for this series and
+    must include moves whose new date falls in the window.
+    """
+    def occurrence(original, exception=None):
+        return Occurrence(
+            series.seriesID, original, series.clubID, series.club.clubName, series.description,
+            (exception and exception.newDate) or original,
+            (exception and exception.newTime) or series.eventTime,
+            (exception and exception.newLocation) or series.eventLocation
+        )
+
+    for day in series_dates(series, window_start, window_end):
+        exception = exceptions.get(day)
+        if exception is None:
+            yield occurrence(day)
+        elif exception.status == "moved" and window_start <= (exception.newDate or day) <= window_end:
+            yield occurrence(day, exception)
+
+    # Occurrences moved into the window from a date outside it
+    for original, exception in exceptions.items():
+        if exception.status == "moved" and exception.newDate and not window_start <= original <= window_end \
+                and window_start <= exception.newDate <= window_end:
+            yield occurrence(original, exception)
+
+
+def recurring_occurrences(window_start, window_end, club_id=None):
+    """All series occurrences in the window, sorted like the events calendar"""
+    query = event_series.query.options(joinedload(event_series.club)).filter(
+        event_series.startDate <= window_end,
+        db.or_(event_series.untilDate.is_(None), event_series.untilDate >= window_start)
+    )
+    if club_id is not None:
+        query = query.filter(event_series.clubID == club_id)
+    active_series = query.all()
+    if not active_series:
+        return []
+
+    exceptions = {}
+    for exception in event_exceptions.query.filter(
+        event_exceptions.seriesID.in_([s.seriesID for s in active_series]),
+        db.or_(
+            event_exceptions.occurrenceDate.between(window_start, window_end),
+            event_exceptions.newDate.between(window_start, window_end)
+        )
+    ):
+        exceptions.setdefault(exception.seriesID, {})[exception.occurrenceDate] = exception
+
+    found = []
+    for series in active_series:
+        found.extend(expand_series(series, exceptions.get(series.seriesID, {}), window_start, window_end))
+    return sorted(found, key=lambda o: (o.eventDate, o.eventTime))
+
+
+def occurrence_id(occurrence):
+    """Stable ID for an expanded occurrence, e.g. "s3-2025-12-16" (its original date)"""
+    return f"s{occurrence.seriesID}-{occurrence.occurrenceDate.isoformat()}"
+
+
+def occurrence_to_dict(occurrence):
+    """Same shape as events.to_dict(), plus the series it came from"""
+    return {
+        "eventID": occurrence_id(occurrence),
+        "seriesID": occurrence.seriesID,
+        "occurrenceDate": occurrence.occurrenceDate.isoformat(),
+        "recurring": True,
+        "clubID": occurrence.clubID,
+        "clubName": occurrence.clubName,
+        "description": occurrence.description,
+        "eventDate": occurrence.eventDate.isoformat(),
+        "eventTime": occurrence.eventTime,
+        "eventLocation": occurrence.eventLocation,
+        "date": occurrence.eventDate.strftime("%d"),
+        "month": occurrence.eventDate.strftime("%b"),
+        "year": occurrence.eventDate.strftime("%Y")
+    }
+
+
+def location_key(location):
+    """The form rooms are compared in: whitespace collapsed and casefolded"""
+    return " ".join((location or "").split()).casefold()
+
+
+# A room booking: a one-off event or an expanded series occurrence (`source`)
+Booking = namedtuple("Booking", "locationKey eventDate startTime endTime source")
+
+
+def booking_to_dict(booking):
+    if isinstance(booking.source, Occurrence):
+        return occurrence_to_dict(booking.source)
+    return booking.source.to_dict()
+
+
+def scheduled_bookings(window_start, window_end, key=None, exclude_event_id=None, exclude_series_id=None):
+    """Events and recurring occurrences (after exceptions) with a parseable time in the window.
+
+    `key` limits the result to one room (a location_key()).
+    """
+    query = events.query.options(joinedload(events.club)).filter(
+        events.eventDate >= window_start,
+        events.eventDate <= window_end,
+        events.startTime.isnot(None)
+    )
+    if key is not None:
+        query = query.filter(events.locationKey == key)
+    if exclude_event_id is not None:
+        query = query.filter(events.eventID != exclude_event_id)
+    bookings = [Booking(e.locationKey, e.eventDate, e.startTime, e.endTime, e) for e in query]
+
+    for occurrence in recurring_occurrences(window_start, window_end):
+        if occurrence.seriesID == exclude_series_id:
+            continue
+        occurrence_key = location_key(occurrence.eventLocation)
+        start, end = parse_time_range(occurrence.eventTime)
+        if start is not None and (key is None or occurrence_key == key):
+            bookings.append(Booking(occurrence_key, occurrence.eventDate, start, end, occurrence))
+    return bookings
+
+
+def find_event_conflicts(location, event_date, start, end, exclude_event_id=None, exclude_series_id=None):
+    """Bookings (events or recurring occurrences, as dicts) in the same location overlapping [start, end)"""
+    overlapping = [
+        booking for booking in scheduled_bookings(event_date, event_date, location_key(location),
+                                                  exclude_event_id, exclude_series_id)
+        if booking.startTime < end and booking.endTime > start
+    ]
+    return [booking_to_dict(b) for b in sorted(overlapping, key=lambda b: b.startTime)]
+
+
+def sweep_event_conflicts(scheduled):
+    """Overlapping pairs among bookings, grouped by room (locationKey) and day.
+
+    Sorts in Python rather than trusting the database's collation to order
+    locationKey, then sweeps each room/day keeping only the events still running
+    at the current start time, so the cost is O(n log n + conflicts).
+    """
+    conflicts = []
+    active = []
+    group = None
+    for event in sorted(scheduled, key=lambda e: (e.locationKey, e.eventDate, e.startTime)):
+        if (event.locationKey, event.eventDate) != group:
+            group = (event.locationKey, event.eventDate)
+            active = []
+        active = [other for other in active if other.endTime > event.startTime]
+        conflicts.extend((other, event) for other in active)
+        active.append(event)
+    return conflicts
+
+
+def _export_value(value):
+    """Convert a column value into something CSV/JSON can write"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_export(filename, columns, statement):
+    """Stream the rows of a select statement as CSV or NDJSON, optionally gzipped.
+
+    Rows are pulled from a server-side cursor in batches of EXPORT_BATCH_SIZE and
+    written out as they arrive, so memory stays flat no matter how many rows match.
+    Query params: ``format`` (csv | ndjson, default csv) and ``gzip`` (true/false).
+    """
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+    compress = request.args.get("gzip", "false").lower() in ("1", "true", "yes")
+
+    def generate():
+        # wbits=31 writes a gzip header/trailer instead of a raw zlib stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+
+        def drain():
+            chunk = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            return compressor.compress(chunk) if compressor else chunk
+
+        if writer:
+            writer.writerow(columns)
+            yield drain()
+
+        result = db.session.execute(
+            statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        try:
+            for partition in result.partitions():
+                for row in partition:
+                    values = [_export_value(v) for v in row]
+                    if writer:
+                        writer.writerow(values)
+                    else:
+                        buffer.write(json.dumps(dict(zip(columns, values))))
+                        buffer.write("\n")
+                chunk = drain()
+                if chunk:
+                    yield chunk
+        finally:
+            result.close()
+
+        if compressor:
+            yield compressor.flush()
+
+    extension = "csv" if fmt == "csv" else "ndjson"
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    if compress:
+        extension += ".gz"
+        mimetype = "application/gzip"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    )
+
+
+def add_missing_columns(engine):
+    """create_all never alters existing tables, so add any model columns they lack"""
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column.name)} " \
+                      f"{column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.exec_driver_sql(ddl)
+                print(f"✓ Added column {table.name}.{column.name}")
+
+
+def backfill_event_times(engine, batch_size=500):
+    """Fill startTime/endTime/locationKey for events created before they existed.
+
+    Rows ending at END_OF_DAY are parsed again too: older versions of
+    parse_time_range read "11 - 1 PM" as 23:00 until the end of the day.
+    """
+    table = events.__table__
+    with engine.begin() as conn:
+        pending = conn.execute(
+            select(table.c.eventID, table.c.eventTime, table.c.eventLocation,
+                   table.c.startTime, table.c.endTime, table.c.locationKey)
+            .where(db.or_(table.c.startTime.is_(None), table.c.endTime == END_OF_DAY, table.c.locationKey.is_(None)))
+        ).all()
+        updates = []
+        for event_id, event_time, location, old_start, old_end, old_key in pending:
+            start, end = parse_time_range(event_time)
+            if (start, end, location_key(location)) != (old_start, old_end, old_key):
+                updates.append({"id": event_id, "start": start, "end": end, "key": location_key(location)})
+        # Core update so the backfill doesn't bump row versions for /api/sync
+        statement = table.update().where(table.c.eventID == db.bindparam("id")) \
+            .values(startTime=db.bindparam("start"), endTime=db.bindparam("end"), locationKey=db.bindparam("key"))
+        for i in range(0, len(updates), batch_size):
+            conn.execute(statement, updates[i:i + batch_size])
+
+
+def relax_credentials_email_index(engine):
+    """Older versions made credentials.email unique on its own; drop that index
+    so a student and a club user sharing an email can both have a row"""
+    inspector = inspect(engine)
+    if not inspector.has_table("credentials"):
+        return
+    for index in inspector.get_indexes("credentials"):
+        if index["unique"] and index["column_names"] == ["email"]:
+            with engine.begin() as conn:
+                db.Index(index["name"], credentials.__table__.c.email).drop(conn)
+            print(f"✓ Dropped unique index credentials.{index['name']}")
+
+
+def backfill_credentials(engine):
+    """Add credentials rows for accounts that don't have one yet"""
+    table = credentials.__table__
+    columns = ["email", "accountType", "accountID", "passwordHash"]
+
+    def missing(email, account_type):
+        return ~select(table.c.credentialID).where(
+            table.c.email == email, table.c.accountType == account_type
+        ).exists()
+
+    with engine.begin() as conn:
+        conn.execute(insert(table).from_select(columns, select(
+            students.email, literal("student"), students.studentID, students.password
+        ).where(missing(students.email, "student"))))
+        conn.execute(insert(table).from_select(columns, select(
+            club_users.email, literal("club"), cast(club_users.clubUserID, db.String(20)), club_users.password
+        ).where(missing(club_users.email, "club"))))
+        shared = conn.execute(
+            select(table.c.email).group_by(table.c.email).having(func.count() > 1).order_by(table.c.email)
+        ).scalars().all()
+    if shared:
+        # Login tries the student account first, then the club account, as it always has
+        print(f"⚠ {len(shared)} emails belong to both a student and a club user: {', '.join(shared)}")
+
+
+def prepare_database(engine):
+    """Create or upgrade the schema on an engine (the default database or a tenant's)"""
+    db.metadata.create_all(engine)
+    # create_all skips existing tables, so make sure newer columns and indexes exist too
+    add_missing_columns(engine)
+    relax_credentials_email_index(engine)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        if conn.execute(select(sync_state.name).where(sync_state.name == "sync")).first() is None:
+            conn.execute(insert(sync_state.__table__).values(name="sync", value=0))
+    backfill_event_times(engine)
+    backfill_credentials(engine)
+
+
+def archive_messages(older_than_days=None, batch_size=None):
+    """Move read messages older than the cutoff into messages_archive.
+
+    Works in batches, each copied and deleted in its own transaction, so the
+    hot table is never locked for long. Returns the number of messages moved.
+    """
+    older_than_days = MESSAGE_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or MESSAGE_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    columns = ["messageID", "senderID", "clubID", "subject", "messageText", "isRead", "sentAt"]
+    moved = 0
+
+    while True:
+        batch_ids = db.session.execute(
+            select(messages.messageID)
+            .where(messages.isRead.is_(True), messages.sentAt < cutoff)
+            .order_by(messages.messageID)
+            .limit(batch_size)
+        ).scalars().all()
+        if not batch_ids:
+            break
+
+        try:
+            db.session.execute(
+                insert(messages_archive.__table__).from_select(
+                    columns + ["archivedAt"],
+                    select(*[messages.__table__.c[name] for name in columns],
+                           literal(datetime.utcnow(), db.DateTime))
+                    .where(messages.messageID.in_(batch_ids))
+                )
+            )
+            db.session.execute(
+                messages.__table__.delete().where(messages.messageID.in_(batch_ids))
+            )
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+        moved += len(batch_ids)
+
+    return moved
+
+
+def page_messages(column, value):
+    """Page through messages newest-first, continuing into the archive.
+
+    The hot table is read first; once it runs out, the same page is topped up
+    from messages_archive. The cursor is "<tier>:<messageID>" where tier is
+    "hot" or "archive", and pages are keyed on messageID (insert order).
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+        tier, _, last_id = request.args.get("cursor", "hot:").partition(":")
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return None, "Invalid limit or cursor"
+    if tier not in ("hot", "archive"):
+        return None, "Invalid limit or cursor"
+
+    page = []
+    if tier == "hot":
+        query = messages.query.options(joinedload(messages.sender), joinedload(messages.club)) \
+            .filter(getattr(messages, column) == value)
+        if last_id is not None:
+            query = query.filter(messages.messageID < last_id)
+        page = [("hot", m) for m in query.order_by(messages.messageID.desc()).limit(limit).all()]
+        last_id = None  # hot tier exhausted below this point; archive starts from the top
+
+    if len(page) < limit:
+        query = messages_archive.query \
+            .options(joinedload(messages_archive.sender), joinedload(messages_archive.club)) \
+            .filter(getattr(messages_archive, column) == value)
+        if last_id is not None:
+            query = query.filter(messages_archive.messageID < last_id)
+        page += [("archive", m) for m in
+                 query.order_by(messages_archive.messageID.desc()).limit(limit - len(page)).all()]
+
+    next_cursor = f"{page[-1][0]}:{page[-1][1].messageID}" if len(page) == limit else None
+    return {"messages": [m.to_dict() for _, m in page], "nextCursor": next_cursor}, None
+
+
+# Compact response formats for bulk clients (?format=... or the Accept header)
+COLUMNAR_MIMETYPE = "application/vnd.clubs.columnar+json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def response_format():
+    """Pick json (default), columnar or msgpack from ?format= or the Accept header"""
+    fmt = request.args.get("format")
+    if fmt:
+        return fmt if fmt in ("json", "columnar", "msgpack") else None
+    best = request.accept_mimetypes.best_match(
+        ["application/json", COLUMNAR_MIMETYPE, *MSGPACK_MIMETYPES], default="application/json"
+    )
+    if best == COLUMNAR_MIMETYPE:
+        return "columnar"
+    if best in MSGPACK_MIMETYPES:
+        return "msgpack"
+    return "json"
+
+
+def compact_response(fmt, columns, rows):
+    """Serialize projected query rows column by column instead of as per-row dicts.
+
+    Layout: {"columns": [...], "rowCount": n, "data": [[column 0 values], [column 1 values], ...]}
+    """
+    data = [[_export_value(v) for v in values] for values in zip(*rows)] or [[] for _ in columns]
+    payload = {"columns": columns, "rowCount": len(rows), "data": data}
+
+    if fmt == "msgpack":
+        if msgpack is None:
+            return jsonify({"error": "MessagePack support is not installed"}), 406
+        return Response(msgpack.packb(payload), mimetype=MSGPACK_MIMETYPES[0])
+    return Response(json.dumps(payload, separators=(",", ":")), mimetype=COLUMNAR_MIMETYPE)
+
+
+def unsupported_format():
+    return jsonify({"error": "format must be 'json', 'columnar' or 'msgpack'"}), 400
+
+
+# ============== ACTIVITY COUNTERS ==============
+
+def upsert_activity(conn, rows):
+    """Add `rows` of bucketed counts to club_activity with one multi-row upsert"""
+    table = club_activity.__table__
+    counts = ["views", "bookmarks", "joins"]
+    if conn.dialect.name == "mysql":
+        statement = mysql.insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in counts})
+    elif conn.dialect.name in ("sqlite", "postgresql"):
+        dialect = sqlite if conn.dialect.name == "sqlite" else postgresql
+        statement = dialect.insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["clubID", "bucketStart"],
+            set_={name: table.c[name] + statement.excluded[name] for name in counts})
+    else:
+        raise NotImplementedError(f"No upsert for {conn.dialect.name}")
+    conn.execute(statement)
+
+
+class ActivityCounters:
+    """Write-behind counters: hits are added up in memory per (tenant, club, bucket)
+    and flushed to club_activity every ACTIVITY_FLUSH_SECONDS by a background thread."""
+
+    def __init__(self, flush_interval=ACTIVITY_FLUSH_SECONDS, batch_size=500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._counts = Counter()  # (tenant, clubID, bucketStart, kind) -> hits
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    def record(self, club_id, kind):
+        tenant = g.get("tenant") if has_app_context() else None
+        bucket = int(time.time()) // ACTIVITY_BUCKET_SECONDS * ACTIVITY_BUCKET_SECONDS
+        with self._lock:
+            self._counts[(tenant, club_id, bucket, kind)] += 1
+        if self._pid != os.getpid():
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            # Also restarts the thread in forked workers, which don't inherit it
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Activity flush failed, will retry: {e}")
+
+    def pending(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+    def flush(self):
+        """Write out everything counted so far; returns the number of rows upserted"""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+            if not counts:
+                return 0
+
+            per_tenant = {}
+            for (tenant, club_id, bucket, kind), hits in counts.items():
+                row = per_tenant.setdefault(tenant, {}).setdefault((club_id, bucket), {
+                    "clubID": club_id, "bucketStart": datetime.utcfromtimestamp(bucket),
+                    "views": 0, "bookmarks": 0, "joins": 0})
+                row[kind] += hits
+
+            written = 0
+            failed = {}  # tenant -> error
+            with app.app_context():
+                for tenant, rows in per_tenant.items():
+                    rows = list(rows.values())
+                    try:
+                        engine = tenant_registry.get(tenant) if tenant else db.engine
+                        with engine.begin() as conn:
+                            for i in range(0, len(rows), self.batch_size):
+                                upsert_activity(conn, rows[i:i + self.batch_size])
+                    except Exception as e:
+                        # Put this tenant's counts back so the next flush retries them,
+                        # and carry on with the other tenants
+                        failed[tenant] = e
+                        with self._lock:
+                            for key, hits in counts.items():
+                                if key[0] == tenant:
+                                    self._counts[key] += hits
+                        continue
+                    written += len(rows)
+            self.flushes += 1
+            self.rows_written += written
+            if failed:
+                names = ", ".join(tenant or "default" for tenant in failed)
+                raise RuntimeError(f"Activity flush failed for {names}") from next(iter(failed.values()))
+            return written
+
+    def stop(self):
+        """Stop the flush thread and write out what is left (runs at exit)"""
+        self._stop.set()
+        try:
+            self.flush()
+        except RuntimeError as e:
+            print(f"{e}: {e.__cause__}")
+
+
+activity_counters = ActivityCounters()
+atexit.register(activity_counters.stop)
+
+trending_cache = {}  # tenant -> (expires at, ranked clubs)
+trending_cache_lock = threading.Lock()
+
+
+def compute_trending():
+    """Rank clubs by activity in the last TRENDING_WINDOW_DAYS, halving a bucket's
+    weight every TRENDING_HALF_LIFE_HOURS"""
+    now = datetime.utcnow()
+    rows = db.session.execute(
+        select(club_activity.clubID, club_activity.bucketStart, club_activity.views,
+               club_activity.bookmarks, club_activity.joins)
+        .where(club_activity.bucketStart >= now - timedelta(days=TRENDING_WINDOW_DAYS))
+    ).all()
+
+    scores = Counter()
+    totals = {}
+    for club_id, bucket_start, views, bookmark_count, joins in rows:
+        age_hours = max((now - bucket_start).total_seconds(), 0) / 3600
+        weight = views * TRENDING_WEIGHTS["views"] + bookmark_count * TRENDING_WEIGHTS["bookmarks"] \
+            + joins * TRENDING_WEIGHTS["joins"]
+        scores[club_id] += weight * 0.5 ** (age_hours / TRENDING_HALF_LIFE_HOURS)
+        total = totals.setdefault(club_id, Counter())
+        total.update(views=views, bookmarks=bookmark_count, joins=joins)
+
+    top = scores.most_common(TRENDING_MAX_RESULTS)
+    found = {club.clubID: club for club in clubs.query.filter(clubs.clubID.in_([c for c, _ in top]))}
+    ranked = []
+    for club_id, score in top:
+        if club_id in found:
+            club_data = found[club_id].to_dict()
+            club_data.update(totals[club_id], trendingScore=round(score, 3))
+            ranked.append(club_data)
+    return ranked
+
+
+def trending_clubs():
+    """compute_trending() for the current tenant, cached for TRENDING_CACHE_SECONDS"""
+    tenant = g.get("tenant")
+    cached = trending_cache.get(tenant)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    ranked = compute_trending()
+    with trending_cache_lock:
+        trending_cache[tenant] = (time.monotonic() + TRENDING_CACHE_SECONDS, ranked)
+    return ranked
+
+
+# ============== AUTOCOMPLETE INDEX ==============
+
+def normalize_term(text):
+    return " ".join((text or "").casefold().split())
+
+
+class PrefixIndex:
+    """Sorted array of search terms for club names and categories, searched with bisect.
+
+    A club is indexed under its full name and under every word in it, so
+    "club" finds "Basketball Club". Categories are indexed while at least one
+    club uses them.
+    """
+
+    MAX_SCAN = 200  # terms looked at per query, bounds the cost of short prefixes
+
+    def __init__(self):
+        self._terms = []    # sorted normalized terms
+        self._entries = []  # (kind, key) for the term at the same position
+        self._clubs = {}    # clubID -> (clubName, category)
+        self._categories = Counter()  # category -> clubs using it
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, rows):
+        """Index (clubID, clubName, category) rows in one sort"""
+        index = cls()
+        pairs = []
+        for club_id, name, category in rows:
+            index._clubs[club_id] = (name, category)
+            index._categories[category] += 1
+            pairs.extend((term, ("club", club_id)) for term in index._club_terms(name))
+        pairs.extend((normalize_term(category), ("category", category)) for category in index._categories)
+        pairs.sort(key=lambda pair: (pair[0], str(pair[1])))
+        index._terms = [term for term, _ in pairs]
+        index._entries = [entry for _, entry in pairs]
+        return index
+
+    @staticmethod
+    def _club_terms(name):
+        words = normalize_term(name).split(" ")
+        return {" ".join(words[i:]) for i in range(len(words)) if words[i]}
+
+    def _insert(self, term, entry):
+        position = bisect.bisect_left(self._terms, term)
+        self._terms.insert(position, term)
+        self._entries.insert(position, entry)
+
+    def _remove(self, term, entry):
+        position = bisect.bisect_left(self._terms, term)
+        while position < len(self._terms) and self._terms[position] == term:
+            if self._entries[position] == entry:
+                del self._terms[position]
+                del self._entries[position]
+                return
+            position += 1
+
+    def _drop_club(self, club_id):
+        name, category = self._clubs.pop(club_id)
+        for term in self._club_terms(name):
+            self._remove(term, ("club", club_id))
+        self._categories[category] -= 1
+        if self._categories[category] <= 0:
+            del self._categories[category]
+            self._remove(normalize_term(category), ("category", category))
+
+    def put_club(self, club_id, name, category):
+        """Add a club, or re-index it after its name or category changed"""
+        with self._lock:
+            if club_id in self._clubs:
+                self._drop_club(club_id)
+            self._clubs[club_id] = (name, category)
+            for term in self._club_terms(name):
+                self._insert(term, ("club", club_id))
+            self._categories[category] += 1
+            if self._categories[category] == 1:
+                self._insert(normalize_term(category), ("category", category))
+
+    def remove_club(self, club_id):
+        with self._lock:
+            if club_id in self._clubs:
+                self._drop_club(club_id)
+
+    def search(self, prefix, limit):
+        """Up to `limit` suggestions; categories and name-start matches rank first"""
+        prefix = normalize_term(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._terms, prefix)
+            stop = bisect.bisect_left(self._terms, prefix + "\uffff", start,
+                                   min(start + self.MAX_SCAN, len(self._terms)))
+            matches = {}
+            for position in range(start, stop):
+                kind, key = self._entries[position]
+                if kind == "category":
+                    matches[(kind, key)] = (0, normalize_term(key))
+                    continue
+                name, _ = self._clubs[key]
+                normalized = normalize_term(name)
+                rank = (1 if normalized.startswith(prefix) else 2, normalized)
+                matches[(kind, key)] = min(matches.get((kind, key), rank), rank)
+            best = sorted(matches, key=matches.get)[:limit]
+            suggestions = []
+            for kind, key in best:
+                if kind == "category":
+                    suggestions.append({"type": "category", "label": key, "clubCount": self._categories[key]})
+                else:
+                    name, category = self._clubs[key]
+                    suggestions.append({"type": "club", "label": name, "clubID": key, "category": category})
+            return suggestions
+
+
+autocomplete_indexes = {}  # tenant -> PrefixIndex
+autocomplete_lock = threading.Lock()
+
+
+def autocomplete_index():
+    """The current tenant's index, built on first use and rebuilt every AUTOCOMPLETE_REFRESH_SECONDS"""
+    tenant = g.get("tenant")
+    index = autocomplete_indexes.get(tenant)
+    if index is None or time.monotonic() - index.built_at > AUTOCOMPLETE_REFRESH_SECONDS:
+        with autocomplete_lock:
+            index = autocomplete_indexes.get(tenant)
+            if index is None or time.monotonic() - index.built_at > AUTOCOMPLETE_REFRESH_SECONDS:
+                rows = db.session.execute(select(clubs.clubID, clubs.clubName, clubs.category)).all()
+                index = autocomplete_indexes[tenant] = PrefixIndex.build(rows)
+    return index
+
+
 # ============== DATABASE INITIALIZATION & SEEDING ==============
 
 default_clubs = [
@@ -322,7 +1897,10 @@ default_clubs = [
 
 
 with app.app_context():
-    db.create_all()
+    for bind_key, engine in db.engines.items():
+        instrument_engine(engine, bind_key or "primary")
+
+    prepare_database(db.engine)
     print("Database tables created!")
 
     # Seed clubs
@@ -355,9 +1933,12 @@ with app.app_context():
                 club_user = club_users(
                     clubID=club.clubID,
                     email=email,
-                    password=hash_password("password123")  # Default password
+                    password=password_hasher.hash("password123")  # Default password
                 )
                 db.session.add(club_user)
+                db.session.flush()  # Get clubUserID
+                db.session.add(credentials(email=email, accountType="club",
+                                           accountID=str(club_user.clubUserID), passwordHash=club_user.password))
                 print(f"✓ Created club user for: {club_data['clubName']}")
 
     db.session.commit()
@@ -409,6 +1990,7 @@ with app.app_context():
         print(f"- Skipped event seeding ({event_count} events already exist)")
     
     print("Event seeding complete!\n")
+    autocomplete_index()
     print("=" * 50)
     print("✅ Database ready! Railway MySQL connected successfully!")
     print("Default club login credentials:")
@@ -434,13 +2016,13 @@ def register_student():
     if students.query.filter_by(studentID=data["studentID"]).first():
         return jsonify({"error": "Student ID already registered"}), 400
     
-    if students.query.filter_by(email=data["email"]).first():
+    if credentials.query.filter_by(email=data["email"]).first():
         return jsonify({"error": "Email already registered"}), 400
 
     new_student = students(
         studentID=data["studentID"],
         email=data["email"],
-        password=hash_password(data["password"]),
+        password=password_hasher.hash(data["password"]),
         firstName=data["firstName"],
         lastName=data["lastName"],
         major=data.get("major"),
@@ -449,6 +2031,8 @@ def register_student():
 
     try:
         db.session.add(new_student)
+        db.session.add(credentials(email=new_student.email, accountType="student",
+                                   accountID=new_student.studentID, passwordHash=new_student.password))
         db.session.commit()
         return jsonify({
             "message": "Student registered successfully!",
@@ -472,6 +2056,11 @@ def register_club():
     if clubs.query.filter_by(clubName=data["clubName"]).first():
         return jsonify({"error": "Club name already registered"}), 400
 
+    if credentials.query.filter_by(email=data["email"]).first():
+        return jsonify({"error": "Email already registered"}), 400
+
+    password = password_hasher.hash(data["password"])
+
     try:
         # Create club (only use fields that exist in Railway database)
         new_club = clubs(
@@ -488,10 +2077,14 @@ def register_club():
         new_club_user = club_users(
             clubID=new_club.clubID,
             email=data["email"],
-            password=hash_password(data["password"])
+            password=password
         )
         db.session.add(new_club_user)
+        db.session.flush()  # Get clubUserID
+        db.session.add(credentials(email=new_club_user.email, accountType="club",
+                                   accountID=str(new_club_user.clubUserID), passwordHash=password))
         db.session.commit()
+        autocomplete_index().put_club(new_club.clubID, new_club.clubName, new_club.category)
 
         return jsonify({
             "message": "Club registered successfully!",
@@ -511,25 +2104,32 @@ def login():
     if not all(k in data for k in ["email", "password"]):
         return jsonify({"error": "Missing required fields"}), 400
     
-    hashed_pwd = hash_password(data["password"])
-    
-    # Try student login
-    student = students.query.filter_by(email=data["email"]).first()
-    if student and student.password == hashed_pwd:
-        return jsonify({
-            "message": "Login successful!",
-            "user": student.to_dict()
-        }), 200
-    
-    # Try club login
-    club_user = club_users.query.filter_by(email=data["email"]).first()
-    if club_user and club_user.password == hashed_pwd:
-        return jsonify({
-            "message": "Login successful!",
-            "user": club_user.to_dict()
-        }), 200
-    
-    return jsonify({"error": "Invalid credentials"}), 401
+    # Students first, then club users ("student" sorts after "club")
+    matches = credentials.query.filter_by(email=data["email"]).order_by(credentials.accountType.desc()).all()
+    if not matches:
+        password_hasher.verify_unknown(data["password"])
+        return jsonify({"error": "Invalid credentials"}), 401
+    credential = next((match for match in matches
+                       if password_hasher.verify(match.passwordHash, data["password"])), None)
+    if credential is None:
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    account = credential.account()
+    if account is None:
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    # Upgrade legacy SHA256 (or outdated) hashes now that we know the password
+    if password_hasher.needs_rehash(credential.passwordHash):
+        try:
+            credential.passwordHash = account.password = password_hasher.hash(data["password"])
+            db.session.commit()
+        except (SQLAlchemyError, PasswordHasherBusy):
+            db.session.rollback()  # keep the old hash; the login itself still succeeds
+
+    return jsonify({
+        "message": "Login successful!",
+        "user": account.to_dict()
+    }), 200
 
 
 # [2] Club Routes
@@ -548,15 +2148,39 @@ def get_clubs():
     if search:
         query = query.filter(clubs.clubName.ilike(f"%{search}%"))
     
+    fmt = response_format()
+    if fmt is None:
+        return unsupported_format()
+    if fmt != "json":
+        member_count = select(func.count(club_members.membershipID)) \
+            .where(club_members.clubID == clubs.clubID).scalar_subquery()
+        event_count = select(func.count(events.eventID)) \
+            .where(events.clubID == clubs.clubID, events.eventDate >= datetime.now().date()).scalar_subquery()
+        rows = query.with_entities(
+            clubs.clubID, clubs.clubName, clubs.description, clubs.category,
+            clubs.meetingTime, clubs.meetingLocation, member_count, event_count
+        ).all()
+        columns = ["clubID", "clubName", "description", "category", "meetingTime",
+                   "meetingLocation", "memberCount", "eventCount"]
+        return compact_response(fmt, columns, rows)
+
     all_clubs = query.all()
     return jsonify([club.to_dict(include_stats=True) for club in all_clubs])
 
 
+@app.route("/api/clubs/trending", methods=["GET"])
+def get_trending_clubs():
+    """Clubs ranked by recent views, bookmarks and joins"""
+    limit = min(request.args.get("limit", 10, type=int), TRENDING_MAX_RESULTS)
+    return jsonify(trending_clubs()[:max(limit, 0)])
+
+
 @app.route("/api/clubs/<int:club_id>", methods=["GET"])
 def get_club(club_id):
     """Get detailed club information"""
     club = clubs.query.get_or_404(club_id)
-    
+    activity_counters.record(club_id, "views")
+
     club_data = club.to_dict(include_stats=True)
     
     # Add additional details
@@ -585,12 +2209,20 @@ def update_club(club_id):
     
     try:
         db.session.commit()
+        autocomplete_index().put_club(club.clubID, club.clubName, club.category)
         return jsonify({"message": "Club updated successfully!", "club": club.to_dict()}), 200
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
 
+@app.route("/api/clubs/autocomplete", methods=["GET"])
+def autocomplete_clubs():
+    """Typeahead suggestions for club names and categories (served from memory)"""
+    limit = min(request.args.get("limit", 8, type=int), AUTOCOMPLETE_MAX_RESULTS)
+    return jsonify(autocomplete_index().search(request.args.get("q", ""), max(limit, 0)))
+
+
 @app.route("/api/clubs/categories", methods=["GET"])
 def get_categories():
     """Get list of all club categories"""
@@ -673,14 +2305,77 @@ def send_message():
 
 @app.route("/api/clubs/<int:club_id>/messages", methods=["GET"])
 def get_club_messages(club_id):
-    """Get all messages for a club (inbox)"""
+    """Get all messages for a club (inbox), or one page of it when `limit` is given"""
+    if "limit" in request.args or "cursor" in request.args:
+        result, error = page_messages("clubID", club_id)
+        if error:
+            return jsonify({"error": error}), 400
+        return jsonify(result)
+
     club_messages = messages.query.filter_by(clubID=club_id).order_by(messages.sentAt.desc()).all()
     return jsonify([m.to_dict() for m in club_messages])
 
 
+@app.route("/api/clubs/<int:club_id>/messages/summary", methods=["GET"])
+def get_club_inbox_summary(club_id):
+    """One row per sender: latest message preview, last activity and unread count"""
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    by_sender = {"partition_by": messages.senderID}
+    ranked = select(
+        messages.messageID,
+        messages.senderID,
+        messages.subject,
+        messages.messageText,
+        messages.sentAt,
+        func.row_number().over(order_by=(messages.sentAt.desc(), messages.messageID.desc()), **by_sender).label("rank"),
+        func.count().over(**by_sender).label("messageCount"),
+        func.sum(case((messages.isRead.is_(True), 0), else_=1)).over(**by_sender).label("unreadCount")
+    ).where(messages.clubID == club_id).subquery()
+
+    rows = db.session.execute(
+        select(
+            ranked.c.senderID,
+            (students.firstName + " " + students.lastName).label("senderName"),
+            ranked.c.messageID,
+            ranked.c.subject,
+            func.substr(ranked.c.messageText, 1, MESSAGE_PREVIEW_LENGTH).label("preview"),
+            ranked.c.sentAt,
+            ranked.c.messageCount,
+            ranked.c.unreadCount
+        )
+        .join(students, ranked.c.senderID == students.studentID)
+        .where(ranked.c.rank == 1)
+        .order_by(ranked.c.sentAt.desc(), ranked.c.senderID)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+
+    return jsonify([{
+        "senderID": row.senderID,
+        "senderName": row.senderName,
+        "latestMessageID": row.messageID,
+        "latestSubject": row.subject,
+        "preview": row.preview,
+        "lastActivity": row.sentAt.isoformat() if row.sentAt else None,
+        "messageCount": row.messageCount,
+        "unreadCount": int(row.unreadCount or 0)
+    } for row in rows])
+
+
 @app.route("/api/students/<string:student_id>/messages", methods=["GET"])
 def get_student_messages(student_id):
-    """Get all messages sent by a student"""
+    """Get all messages sent by a student, or one page of them when `limit` is given"""
+    if "limit" in request.args or "cursor" in request.args:
+        result, error = page_messages("senderID", student_id)
+        if error:
+            return jsonify({"error": error}), 400
+        return jsonify(result)
+
     student_messages = messages.query.filter_by(senderID=student_id).order_by(messages.sentAt.desc()).all()
     return jsonify([m.to_dict() for m in student_messages])
 
@@ -726,6 +2421,7 @@ def add_bookmark():
     try:
         db.session.add(new_bookmark)
         db.session.commit()
+        activity_counters.record(new_bookmark.clubID, "bookmarks")
         return jsonify({"message": "Bookmark added!", "bookmark": new_bookmark.to_dict()}), 201
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -780,9 +2476,55 @@ def get_events():
         query = query.filter(events.eventDate <= datetime.strptime(end_date, "%Y-%m-%d").date())
     if club_id:
         query = query.filter_by(clubID=int(club_id))
+
+    # Recurring meetings are expanded only for the requested window
+    today = datetime.now().date()
+    window_start = max(today, datetime.strptime(start_date, "%Y-%m-%d").date()) if start_date else today
+    window_end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date \
+        else today + timedelta(days=RECURRENCE_WINDOW_DAYS)
+    occurrences = recurring_occurrences(window_start, window_end, int(club_id) if club_id else None)
     
+    fmt = response_format()
+    if fmt is None:
+        return unsupported_format()
+    if fmt != "json":
+        # date/month/year are left out; clients derive them from eventDate
+        rows = query.join(clubs, events.clubID == clubs.clubID).with_entities(
+            events.eventID, events.clubID, clubs.clubName, events.description,
+            events.eventDate, events.eventTime, events.eventLocation, literal(None, db.Integer),
+            literal(None, db.Date)
+        ).order_by(events.eventDate, events.eventTime).all()
+        recurring = [(occurrence_id(o), o.clubID, o.clubName, o.description, o.eventDate, o.eventTime,
+                      o.eventLocation, o.seriesID, o.occurrenceDate) for o in occurrences]
+        rows = list(heapq.merge(rows, recurring, key=lambda row: (row[4], row[5])))
+        columns = ["eventID", "clubID", "clubName", "description", "eventDate", "eventTime",
+                   "eventLocation", "seriesID", "occurrenceDate"]
+        return compact_response(fmt, columns, rows)
+
     all_events = query.order_by(events.eventDate, events.eventTime).all()
-    return jsonify([event.to_dict() for event in all_events])
+    return jsonify(list(heapq.merge(
+        [event.to_dict() for event in all_events],
+        [occurrence_to_dict(o) for o in occurrences],
+        key=lambda e: (e["eventDate"], e["eventTime"])
+    )))
+
+
+@app.route("/api/events/conflicts", methods=["GET"])
+def get_event_conflicts():
+    """Campus-wide report of double-booked locations over a date range"""
+    try:
+        start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d").date() \
+            if "start_date" in request.args else datetime.now().date()
+        end_date = datetime.strptime(request.args["end_date"], "%Y-%m-%d").date() \
+            if "end_date" in request.args else start_date + timedelta(days=30)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    return jsonify([{
+        "eventLocation": first.source.eventLocation,
+        "eventDate": first.eventDate.isoformat(),
+        "events": [booking_to_dict(first), booking_to_dict(second)]
+    } for first, second in sweep_event_conflicts(scheduled_bookings(start_date, end_date))])
 
 
 @app.route("/api/events/<int:event_id>", methods=["GET"])
@@ -796,9 +2538,17 @@ def get_event(event_id):
 def club_events(club_id):
     """Get all events for a club or create a new event"""
     if request.method == "GET":
-        # Get all events for this club
+        # Get all events for this club, plus its recurring meetings in the window
         club_events = events.query.filter_by(clubID=club_id).all()
-        return jsonify([event.to_dict() for event in club_events]), 200
+        today = datetime.now().date()
+        start_date = request.args.get("start_date")
+        end_date = request.args.get("end_date")
+        window_start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else today
+        window_end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date \
+            else window_start + timedelta(days=RECURRENCE_WINDOW_DAYS)
+        occurrences = recurring_occurrences(window_start, window_end, club_id)
+        return jsonify([event.to_dict() for event in club_events] +
+                       [occurrence_to_dict(o) for o in occurrences]), 200
     
     elif request.method == "POST":
         # Create a new event for a club
@@ -815,6 +2565,15 @@ def club_events(club_id):
             eventTime=data["eventTime"],
             eventLocation=data["eventLocation"]
         )
+
+        if new_event.startTime is not None and not data.get("allowConflicts"):
+            conflicts = find_event_conflicts(new_event.eventLocation, new_event.eventDate,
+                                             new_event.startTime, new_event.endTime)
+            if conflicts:
+                return jsonify({
+                    "error": f"{new_event.eventLocation} is already booked at that time",
+                    "conflicts": conflicts
+                }), 409
         
         try:
             db.session.add(new_event)
@@ -839,6 +2598,19 @@ def update_event(event_id):
         event.eventTime = data["eventTime"]
     if "eventLocation" in data:
         event.eventLocation = data["eventLocation"]
+
+    if event.startTime is not None and not data.get("allowConflicts"):
+        with db.session.no_autoflush:
+            conflicts = find_event_conflicts(event.eventLocation, event.eventDate,
+                                             event.startTime, event.endTime, exclude_event_id=event.eventID)
+        if conflicts:
+            # Build the response first: rollback expires the event and reloads the old location
+            body = {
+                "error": f"{event.eventLocation} is already booked at that time",
+                "conflicts": conflicts
+            }
+            db.session.rollback()
+            return jsonify(body), 409
     
     try:
         db.session.commit()
@@ -862,11 +2634,159 @@ def delete_event(event_id):
         return jsonify({"error": str(e)}), 400
 
 
+# Recurring Event Routes
+
+@app.route("/api/clubs/<int:club_id>/series", methods=["GET"])
+def get_club_series(club_id):
+    """Get a club's recurring event rules"""
+    return jsonify([s.to_dict() for s in event_series.query.filter_by(clubID=club_id).all()])
+
+
+@app.route("/api/clubs/<int:club_id>/series", methods=["POST"])
+def create_series(club_id):
+    """Create a recurring event (stored as a rule, not one row per occurrence)"""
+    clubs.query.get_or_404(club_id)
+    data = request.get_json()
+
+    required_fields = ["description", "startDate", "eventTime", "eventLocation"]
+    if not all(k in data for k in required_fields):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    frequency = data.get("frequency", "weekly")
+    by_day = data.get("byDay") or []
+    if isinstance(by_day, str):
+        by_day = by_day.split(",")
+    by_day = [code.strip().upper() for code in by_day]
+    if frequency not in ("daily", "weekly") or any(code not in WEEKDAY_CODES for code in by_day):
+        return jsonify({"error": "frequency must be daily or weekly and byDay like ['TU', 'TH']"}), 400
+
+    try:
+        new_series = event_series(
+            clubID=club_id,
+            frequency=frequency,
+            interval=max(int(data.get("interval", 1)), 1),
+            byDay=",".join(by_day) if frequency == "weekly" and by_day else None,
+            startDate=datetime.strptime(data["startDate"], "%Y-%m-%d").date(),
+            untilDate=datetime.strptime(data["untilDate"], "%Y-%m-%d").date() if data.get("untilDate") else None,
+            eventTime=data["eventTime"],
+            eventLocation=data["eventLocation"],
+            description=data["description"]
+        )
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD and interval a number"}), 400
+
+    start, end = parse_time_range(new_series.eventTime)
+    if start is not None and not data.get("allowConflicts"):
+        # Checked over the same horizon the calendar expands to
+        window_start = max(new_series.startDate, datetime.now().date())
+        window_end = window_start + timedelta(days=RECURRENCE_WINDOW_DAYS)
+        by_date = {}
+        for booking in scheduled_bookings(window_start, window_end, location_key(new_series.eventLocation)):
+            by_date.setdefault(booking.eventDate, []).append(booking)
+        conflicts = [
+            {"occurrenceDate": day.isoformat(), "conflict": booking_to_dict(booking)}
+            for day in series_dates(new_series, window_start, window_end)
+            for booking in by_date.get(day, [])
+            if booking.startTime < end and booking.endTime > start
+        ]
+        if conflicts:
+            return jsonify({
+                "error": f"{new_series.eventLocation} is already booked for some of these meetings",
+                "conflicts": conflicts
+            }), 409
+
+    try:
+        db.session.add(new_series)
+        db.session.commit()
+        return jsonify({"message": "Recurring event created successfully!", "series": new_series.to_dict()}), 201
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/series/<int:series_id>", methods=["DELETE"])
+def delete_series(series_id):
+    """Delete a recurring event and all its exceptions"""
+    series = event_series.query.get_or_404(series_id)
+
+    try:
+        db.session.delete(series)
+        db.session.commit()
+        return jsonify({"message": "Recurring event deleted successfully!"}), 200
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/api/series/<int:series_id>/exceptions", methods=["POST"])
+def set_series_exception(series_id):
+    """Cancel or move a single occurrence of a recurring event"""
+    series = event_series.query.get_or_404(series_id)
+    data = request.get_json()
+
+    if not all(k in data for k in ["occurrenceDate", "status"]):
+        return jsonify({"error": "Missing required fields"}), 400
+    if data["status"] not in ("cancelled", "moved"):
+        return jsonify({"error": "status must be 'cancelled' or 'moved'"}), 400
+
+    try:
+        occurrence_date = datetime.strptime(data["occurrenceDate"], "%Y-%m-%d").date()
+        new_date = datetime.strptime(data["newDate"], "%Y-%m-%d").date() if data.get("newDate") else None
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    if occurrence_date not in series_dates(series, occurrence_date, occurrence_date):
+        return jsonify({"error": "The series has no occurrence on that date"}), 400
+
+    exception = event_exceptions.query.filter_by(seriesID=series_id, occurrenceDate=occurrence_date).first() \
+        or event_exceptions(seriesID=series_id, occurrenceDate=occurrence_date)
+    exception.status = data["status"]
+    exception.newDate = new_date if data["status"] == "moved" else None
+    exception.newTime = data.get("newTime") if data["status"] == "moved" else None
+    exception.newLocation = data.get("newLocation") if data["status"] == "moved" else None
+
+    if exception.status == "moved" and not data.get("allowConflicts"):
+        location = exception.newLocation or series.eventLocation
+        start, end = parse_time_range(exception.newTime or series.eventTime)
+        if start is not None:
+            with db.session.no_autoflush:
+                conflicts = find_event_conflicts(location, exception.newDate or occurrence_date, start, end,
+                                                 exclude_series_id=series_id)
+            if conflicts:
+                db.session.rollback()
+                return jsonify({
+                    "error": f"{location} is already booked at that time",
+                    "conflicts": conflicts
+                }), 409
+
+    try:
+        db.session.add(exception)
+        db.session.commit()
+        return jsonify({"message": "Occurrence updated successfully!", "exception": exception.to_dict()}), 200
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+
 # Club Membership Routes
 
 @app.route("/api/clubs/<int:club_id>/members", methods=["GET"])
 def get_club_members(club_id):
     """Get all members of a club"""
+    fmt = response_format()
+    if fmt is None:
+        return unsupported_format()
+    if fmt != "json":
+        rows = club_members.query.filter_by(clubID=club_id) \
+            .join(students, club_members.studentID == students.studentID) \
+            .join(clubs, club_members.clubID == clubs.clubID) \
+            .with_entities(
+                club_members.membershipID, club_members.studentID,
+                students.firstName + " " + students.lastName, club_members.clubID,
+                clubs.clubName, club_members.role, club_members.joinedAt
+            ).all()
+        columns = ["membershipID", "studentID", "studentName", "clubID", "clubName", "role", "joinedAt"]
+        return compact_response(fmt, columns, rows)
+
     members = club_members.query.filter_by(clubID=club_id).all()
     return jsonify([m.to_dict() for m in members])
 
@@ -897,6 +2817,7 @@ def join_club(club_id):
     try:
         db.session.add(new_member)
         db.session.commit()
+        activity_counters.record(club_id, "joins")
         return jsonify({"message": "Joined club successfully!", "membership": new_member.to_dict()}), 201
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -917,6 +2838,130 @@ def leave_club(membership_id):
         return jsonify({"error": str(e)}), 400
 
 
+# Export Routes (streamed, for club admins)
+
+@app.route("/api/clubs/<int:club_id>/members/export", methods=["GET"])
+def export_club_members(club_id):
+    """Export a club's member list as CSV or NDJSON"""
+    clubs.query.get_or_404(club_id)
+    statement = (
+        select(
+            club_members.membershipID,
+            club_members.studentID,
+            (students.firstName + " " + students.lastName).label("studentName"),
+            students.email,
+            club_members.clubID,
+            clubs.clubName,
+            club_members.role,
+            club_members.joinedAt
+        )
+        .join(students, club_members.studentID == students.studentID)
+        .join(clubs, club_members.clubID == clubs.clubID)
+        .where(club_members.clubID == club_id)
+        .order_by(club_members.membershipID)
+    )
+    columns = ["membershipID", "studentID", "studentName", "email", "clubID", "clubName", "role", "joinedAt"]
+    return stream_export(f"club_{club_id}_members", columns, statement)
+
+
+@app.route("/api/clubs/<int:club_id>/messages/export", methods=["GET"])
+def export_club_messages(club_id):
+    """Export a club's inbox history (including archived messages) as CSV or NDJSON"""
+    clubs.query.get_or_404(club_id)
+
+    def history(table, archived):
+        return (
+            select(
+                table.messageID,
+                table.senderID,
+                (students.firstName + " " + students.lastName).label("senderName"),
+                table.clubID,
+                clubs.clubName,
+                table.subject,
+                table.messageText,
+                table.isRead,
+                table.sentAt,
+                literal(archived).label("archived")
+            )
+            .join(students, table.senderID == students.studentID)
+            .join(clubs, table.clubID == clubs.clubID)
+            .where(table.clubID == club_id)
+        )
+
+    # Archived rows keep their original messageID, so one ordering covers both tiers
+    statement = union_all(history(messages, False), history(messages_archive, True)).order_by("messageID")
+    columns = ["messageID", "senderID", "senderName", "clubID", "clubName", "subject", "messageText", "isRead",
+               "sentAt", "archived"]
+    return stream_export(f"club_{club_id}_messages", columns, statement)
+
+
+@app.route("/api/clubs/<int:club_id>/events/export", methods=["GET"])
+def export_club_events(club_id):
+    """Export a club's full event archive as CSV or NDJSON"""
+    clubs.query.get_or_404(club_id)
+    statement = (
+        select(
+            events.eventID,
+            events.clubID,
+            clubs.clubName,
+            events.description,
+            events.eventDate,
+            events.eventTime,
+            events.eventLocation
+        )
+        .join(clubs, events.clubID == clubs.clubID)
+        .where(events.clubID == club_id)
+        .order_by(events.eventDate, events.eventID)
+    )
+    columns = ["eventID", "clubID", "clubName", "description", "eventDate", "eventTime", "eventLocation"]
+    return stream_export(f"club_{club_id}_events", columns, statement)
+
+
+# Delta Sync Routes
+
+@app.route("/api/sync", methods=["GET"])
+def sync_changes():
+    """Rows of clubs/events/media changed since a client's watermark, plus deleted IDs"""
+    tables = request.args.get("tables", ",".join(SYNCED_MODELS)).split(",")
+    if any(name not in SYNCED_MODELS for name in tables):
+        return jsonify({"error": f"tables must be a subset of {', '.join(SYNCED_MODELS)}"}), 400
+    since = request.args.get("since")
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        return jsonify({"error": "since must be an integer version"}), 400
+
+    # Read the watermark first and cap rows at it, so nothing committed later is skipped next time
+    version = db.session.execute(select(sync_state.value).where(sync_state.name == "sync")).scalar() or 0
+    result = {"version": version, "full": since is None}
+
+    for name in tables:
+        model = SYNCED_MODELS[name]
+        query = model.query.filter(model.rowVersion <= version)
+        if name != "clubs":
+            query = query.options(joinedload(model.club))
+        deleted = []
+        if since is not None:
+            query = query.filter(model.rowVersion > since)
+            deleted = db.session.execute(
+                select(sync_tombstones.rowID).where(
+                    sync_tombstones.tableName == name,
+                    sync_tombstones.rowVersion > since,
+                    sync_tombstones.rowVersion <= version
+                )
+            ).scalars().all()
+
+        upserted = []
+        for row in query.order_by(model.rowVersion).all():
+            data = row.to_dict()
+            data["rowVersion"] = row.rowVersion
+            data["updatedAt"] = row.updatedAt.isoformat() if row.updatedAt else None
+            upserted.append(data)
+        result[name] = {"upserted": upserted, "deleted": deleted}
+
+    return jsonify(result)
+
+
 # Utility Routes
 
 @app.route("/api/health", methods=["GET"])
@@ -932,7 +2977,7 @@ def get_stats():
         "totalClubs": clubs.query.count(),
         "totalStudents": students.query.count(),
         "totalEvents": events.query.filter(events.eventDate >= datetime.now().date()).count(),
-        "totalMessages": messages.query.count(),
+        "totalMessages": messages.query.count() + messages_archive.query.count(),
         "clubsByCategory": {}
     }
     
@@ -944,5 +2989,208 @@ def get_stats():
     return jsonify(stats)
 
 
+@app.route("/api/metrics/pool", methods=["GET"])
+def get_pool_metrics():
+    """Connection pool telemetry per engine (JSON, or Prometheus text with ?format=prometheus)"""
+    if request.args.get("format") == "prometheus":
+        return Response(pool_metrics_prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify({label: telemetry.snapshot() for label, telemetry in pool_telemetry.items()})
+
+
+# ============== REQUEST PROFILING ==============
+
+class StackSampler:
+    """Background thread that samples the stacks of registered request threads.
+
+    Cheap enough to leave on for every request: the request thread only
+    registers/unregisters itself, and the sampler wakes every few milliseconds.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._targets = {}  # thread ident -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, ident):
+        with self._lock:
+            self._targets[ident] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, ident):
+        with self._lock:
+            return self._targets.pop(ident, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                targets = dict(self._targets)
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            samples = [(ident, self._collapse(frames[ident])) for ident in targets if ident in frames]
+            # Counted under the lock: stop() hands the Counter to the request thread
+            with self._lock:
+                for ident, stack in samples:
+                    stacks = self._targets.get(ident)
+                    if stacks is not None:
+                        stacks[stack] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+stack_sampler = StackSampler(PROFILE_SAMPLER_INTERVAL_MS / 1000)
+
+# Only one cProfile.Profile can be enabled per process on Python 3.12+
+# (sys.monitoring has a single profiler slot), so cProfile captures take
+# turns; a request that can't get the lock falls back to the stack sampler.
+profiler_lock = threading.Lock()
+
+
+def write_profile(suffix, write):
+    """Write one capture into PROFILE_DIR and return its path"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{request.endpoint or 'unknown'}{suffix}"
+    path = os.path.join(PROFILE_DIR, name)
+    write(path)
+    return path
+
+
+def rotate_profiles():
+    """Keep only the newest PROFILE_MAX_FILES captures in PROFILE_DIR.
+
+    A capture is a .prof or .folded file plus its .json summary; both share a
+    name and are removed together.
+    """
+    captures = {}  # name without extension -> (newest mtime, paths)
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file():
+            stem = os.path.splitext(entry.name)[0]
+            mtime, paths = captures.get(stem, (0, []))
+            captures[stem] = (max(mtime, entry.stat().st_mtime), paths + [entry.path])
+    oldest_first = sorted(captures.values(), key=lambda capture: capture[0])
+    for _, paths in oldest_first[:max(len(oldest_first) - PROFILE_MAX_FILES, 0)]:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def start_request_profile():
+    """Profile this request with cProfile (admin header / sampling) or the stack sampler"""
+    header = request.headers.get("X-Profile")
+    g.profile_admin = bool(PROFILE_ADMIN_TOKEN and header and hmac.compare_digest(header.encode(), PROFILE_ADMIN_TOKEN.encode()))
+    wants_cprofile = g.profile_admin or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+    if wants_cprofile and profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.profiler = profiler
+        except ValueError:
+            # Another tool (debugger, coverage) already holds the profiler slot
+            profiler_lock.release()
+    if "profiler" not in g and (g.profile_admin or PROFILE_SLOW_MS > 0):
+        stack_sampler.start(threading.get_ident())
+    g.profile_sql = [0, 0.0]  # queries, seconds
+    g.profile_started = time.perf_counter()
+
+
+def finish_request_profile(response):
+    started = g.pop("profile_started", None)
+    if started is None:
+        return response
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    profiler = g.pop("profiler", None)
+    stacks = None if profiler else stack_sampler.stop(threading.get_ident())
+    queries, sql_seconds = g.pop("profile_sql")
+
+    if profiler:
+        profiler.disable()
+        profiler_lock.release()
+        path = write_profile(".prof", profiler.dump_stats)
+    elif stacks is not None and (elapsed_ms >= PROFILE_SLOW_MS or g.get("profile_admin")):
+        def write_folded(path):
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        path = write_profile(".folded", write_folded)
+    else:
+        return response
+
+    summary = {
+        "method": request.method,
+        "path": request.full_path,
+        "status": response.status_code,
+        "elapsedMs": round(elapsed_ms, 2),
+        "queries": queries,
+        "sqlMs": round(sql_seconds * 1000, 2),
+        "profile": os.path.basename(path)
+    }
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump(summary, f)
+    rotate_profiles()
+    if g.get("profile_admin"):
+        response.headers["X-Profile-File"] = os.path.basename(path)
+    return response
+
+
+def release_request_profile(exc):
+    """Undo start_request_profile if finish_request_profile never ran"""
+    profiler = g.pop("profiler", None)
+    if profiler:
+        profiler.disable()
+        profiler_lock.release()
+    stack_sampler.stop(threading.get_ident())
+
+
+def _before_profiled_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile_sql" in g:
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+
+def _after_profiled_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("profile_query_started")
+    if started and has_request_context() and "profile_sql" in g:
+        g.profile_sql[0] += 1
+        g.profile_sql[1] += time.perf_counter() - started.pop()
+
+
+# Hooks are only installed when profiling is configured, so it costs nothing otherwise
+if PROFILING_ENABLED:
+    app.before_request(start_request_profile)
+    app.after_request(finish_request_profile)
+    app.teardown_request(release_request_profile)
+    event.listen(Engine, "before_cursor_execute", _before_profiled_query)
+    event.listen(Engine, "after_cursor_execute", _after_profiled_query)
+
+
+# ============== CLI COMMANDS ==============
+
+@app.cli.command("archive-messages")
+@click.option("--days", type=int, default=None, help="Archive read messages older than this many days.")
+@click.option("--batch-size", type=int, default=None, help="Messages moved per transaction.")
+@click.option("--tenant", default=None, help="Run against this tenant's database instead of the default.")
+def archive_messages_command(days, batch_size, tenant):
+    """Move old, read messages into the archive table"""
+    if tenant:
+        if tenant_registry.url_for(tenant) is None:
+            raise click.BadParameter(f"Unknown tenant: {tenant}", param_hint="--tenant")
+        g.tenant = tenant
+        g.tenant_engine = tenant_registry.get(tenant)
+    moved = archive_messages(days, batch_size)
+    print(f"Archived {moved} messages")
+
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
\ No newline at end of file
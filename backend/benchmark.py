@@ -0,0 +1,343 @@
+"""Local load tests for the backend.
+
+Runs the Flask app in-process and drives it from a pool of threads with the
+test client, so no server needs to be started. Every scenario runs in a fresh
+Python process because most settings (pool size, replicas, ...) are read from
+the environment when app.py is imported.
+
+Uses DATABASE_URL if it is set, otherwise a throwaway SQLite file.
+
+Usage:
+    python benchmark.py pool --settings 2:0,5:5,10:10 --threads 32 --requests 3000
+    python benchmark.py formats --rows 5000 --repeat 20
+    python benchmark.py tenants --tenants 4 --threads 8 --requests 1000
+    python benchmark.py activity --threads 8 --hits 200000 --clubs 5
+    python benchmark.py login --methods sha256,scrypt --workers 1,4 --threads 32 --requests 400
+"""
+import argparse
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(app, paths, threads, total_requests, headers=None, method="GET", bodies=None):
+    """Send `total_requests` requests round-robin over `paths` (and JSON `bodies`) from `threads` threads"""
+    latencies = []
+    errors = 0
+    busy = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        nonlocal errors, busy
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        body = bodies[i % len(bodies)] if bodies else None
+        response = local.client.open(paths[i % len(paths)], method=method, json=body, headers=headers)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code == 503:
+                busy += 1
+            elif response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one, range(total_requests)))
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "busy": busy,
+        "throughput": round(total_requests / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def import_app():
+    """Import app.py quietly (it prints seeding progress on import)"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        import app
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return app
+
+
+def spawn(command, env_overrides, args):
+    """Run a scenario in a child process and return its JSON result"""
+    env = dict(os.environ, **env_overrides)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), command] + args,
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# ---------- pool: effect of pool size / overflow / timeout ----------
+
+def pool_worker(args):
+    app = import_app()
+    paths = ["/api/clubs", "/api/events", "/api/clubs/1", "/api/stats"]
+    result = run_load(app.app, paths, args.threads, args.requests)
+    metrics = app.app.test_client().get("/api/metrics/pool").get_json()["primary"]
+    result.update({
+        "wait_count": metrics["checkoutWait"]["count"],
+        "wait_avg_ms": round(metrics["checkoutWait"]["sumSeconds"] / max(metrics["checkoutWait"]["count"], 1) * 1000, 3),
+        "peak_checked_out": metrics["peakCheckedOut"],
+        "timeouts": metrics["checkoutTimeouts"],
+        "opened": metrics["connectionsOpened"],
+        "closed": metrics["connectionsClosed"],
+        "ping_avg_ms": round(metrics["prePing"]["sumSeconds"] / max(metrics["prePing"]["count"], 1) * 1000, 3),
+    })
+    print(json.dumps(result))
+
+
+def pool_benchmark(args):
+    print(f"{'size:overflow:timeout':>22} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'wait ms':>8} "
+          f"{'peak':>5} {'timeouts':>8} {'opened':>6} {'closed':>6} {'ping ms':>8} {'errors':>6}")
+    for setting in args.settings.split(","):
+        size, overflow, timeout = (setting.split(":") + ["30"])[:3]
+        env = {"DB_POOL_SIZE": size, "DB_MAX_OVERFLOW": overflow, "DB_POOL_TIMEOUT": timeout}
+        r = spawn("_pool", env, ["--threads", str(args.threads), "--requests", str(args.requests)])
+        print(f"{setting:>22} {r['throughput']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['wait_avg_ms']:>8} "
+              f"{r['peak_checked_out']:>5} {r['timeouts']:>8} {r['opened']:>6} {r['closed']:>6} "
+              f"{r['ping_avg_ms']:>8} {r['errors']:>6}")
+
+
+# ---------- formats: payload size and server CPU per response format ----------
+
+def seed_bulk_rows(module, rows, tenant=None):
+    """Add `rows` clubs, students, club 1 members and upcoming club 1 events"""
+    with module.app.app_context():
+        if tenant:
+            module.g.tenant_engine = module.tenant_registry.get(tenant)
+        db = module.db
+        if module.club_members.query.count() >= rows:
+            return
+        today = module.datetime.now().date()
+        db.session.execute(module.insert(module.clubs), [
+            {"clubName": f"Bench Club {i}", "description": "Benchmark club", "category": "Academic",
+             "meetingTime": "Every Mon, 6 PM", "meetingLocation": f"Room {i}"} for i in range(rows)
+        ])
+        db.session.execute(module.insert(module.students), [
+            {"studentID": f"B{i:07d}", "email": f"bench{i}@university.edu", "password": "x",
+             "firstName": "Bench", "lastName": f"Student{i}", "major": "CS", "year": "Junior"}
+            for i in range(rows)
+        ])
+        db.session.execute(module.insert(module.club_members), [
+            {"studentID": f"B{i:07d}", "clubID": 1, "role": "Member", "joinedAt": module.datetime.utcnow()}
+            for i in range(rows)
+        ])
+        db.session.execute(module.insert(module.events), [
+            {"clubID": 1, "eventDate": today + module.timedelta(days=1 + i % 300),
+             "eventTime": "5:00 PM - 7:00 PM", "eventLocation": "Gym A", "description": f"Bench event {i}"}
+            for i in range(rows)
+        ])
+        db.session.commit()
+
+
+def formats_benchmark(args):
+    app = import_app()
+    seed_bulk_rows(app, args.rows)
+    client = app.app.test_client()
+    endpoints = [("get_events", "/api/events"), ("get_clubs", "/api/clubs"),
+                 ("get_club_members", "/api/clubs/1/members")]
+
+    print(f"{'endpoint':>17} {'format':>9} {'bytes':>10} {'gzip bytes':>11} {'cpu ms/req':>11}")
+    for name, path in endpoints:
+        for fmt in ("json", "columnar", "msgpack"):
+            url = path if fmt == "json" else f"{path}?format={fmt}"
+            body = client.get(url).data  # warm-up
+            start = time.process_time()
+            for _ in range(args.repeat):
+                body = client.get(url).data
+            cpu_ms = (time.process_time() - start) / args.repeat * 1000
+            print(f"{name:>17} {fmt:>9} {len(body):>10} {len(gzip.compress(body)):>11} {cpu_ms:>11.2f}")
+
+
+# ---------- tenants: one tenant's heavy traffic vs the others' latency ----------
+
+def tenants_worker(args):
+    app = import_app()
+    tenants = [f"campus{i}" for i in range(args.tenants)]
+    noisy = tenants[0]
+    seed_bulk_rows(app, args.rows, tenant=noisy)
+    paths = ["/api/clubs", "/api/events", "/api/stats"]
+    noisy_paths = ["/api/clubs/1/members/export", "/api/events", "/api/clubs"]
+
+    results = {}
+    quiet_alone = run_load(app.app, paths, args.threads, args.requests, {"X-Tenant": tenants[-1]})
+
+    def noisy_load():
+        results[noisy] = run_load(app.app, noisy_paths, args.threads, args.requests // 4, {"X-Tenant": noisy})
+
+    background = threading.Thread(target=noisy_load)
+    background.start()
+    with ThreadPoolExecutor(max_workers=len(tenants) - 1) as executor:
+        quiet = executor.map(lambda t: (t, run_load(app.app, paths, args.threads, args.requests, {"X-Tenant": t})),
+                             tenants[1:])
+        results.update(quiet)
+    background.join()
+
+    # Isolation: a club created in one tenant must not be visible in another
+    client = app.app.test_client()
+    client.post("/api/auth/register/club", headers={"X-Tenant": tenants[1]}, json={
+        "clubName": "Isolation Check", "email": "isolation@university.edu", "password": "x",
+        "category": "Academic", "description": "", "meetingTime": "", "meetingLocation": ""})
+    leaked = [t for t in tenants if t != tenants[1] and any(
+        c["clubName"] == "Isolation Check"
+        for c in client.get("/api/clubs", headers={"X-Tenant": t}).get_json())]
+    print(json.dumps({"alone": quiet_alone, "tenants": results, "noisy": noisy, "leaked": leaked,
+                      "engines": app.tenant_registry.active_tenants()}))
+
+
+def tenants_benchmark(args):
+    directory = tempfile.mkdtemp(prefix="club_tenants_")
+    env = {"TENANT_DATABASE_URL_TEMPLATE": f"sqlite:///{directory}/{{tenant}}.db",
+           "TENANTS": ",".join(f"campus{i}" for i in range(args.tenants))}
+    r = spawn("_tenants", env, ["--tenants", str(args.tenants), "--threads", str(args.threads),
+                                "--requests", str(args.requests), "--rows", str(args.rows)])
+    print(f"{'tenant':>16} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    rows = [("alone", r["alone"])] + sorted(r["tenants"].items())
+    for name, t in rows:
+        label = f"{name} (noisy)" if name == r["noisy"] else name
+        print(f"{label:>16} {t['throughput']:>8} {t['p50_ms']:>8} {t['p99_ms']:>8} {t['errors']:>6}")
+    print(f"engines open: {len(r['engines'])}, cross-tenant leaks: {r['leaked'] or 'none'}")
+
+
+# ---------- activity: cost of the write-behind view counters ----------
+
+def activity_benchmark(args):
+    app = import_app()
+    counters = app.ActivityCounters(flush_interval=3600)  # flushed by hand below
+    per_thread = args.hits // args.threads
+
+    def hits(seed):
+        for i in range(per_thread):
+            counters.record(1 + (seed + i) % args.clubs, "views")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(hits, range(args.threads)))
+    recorded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = counters.flush()
+    flushed = time.perf_counter() - started
+    print(f"recorded {per_thread * args.threads} hits with {args.threads} threads: "
+          f"{per_thread * args.threads / recorded:,.0f} hits/s")
+    print(f"flushed {rows} rows in one pass: {flushed * 1000:.1f} ms")
+
+
+# ---------- login: throughput and latency of password checks ----------
+
+def login_worker(args):
+    app = import_app()
+    accounts = 50
+    with app.app.app_context():
+        if app.credentials.query.filter(app.credentials.email.like("login%@bench.edu")).count() == 0:
+            # "sha256" stores legacy hashes the way login worked before credentials
+            # existed; they are upgraded on first login, so the load test skips that
+            stored = [app.hash_password("secret") if args.methods == "sha256" else app.password_hasher.hash("secret")
+                      for _ in range(accounts)]
+            app.db.session.execute(app.insert(app.students), [
+                {"studentID": f"L{i:07d}", "email": f"login{i}@bench.edu", "password": stored[i],
+                 "firstName": "Login", "lastName": f"Bench{i}"} for i in range(accounts)
+            ])
+            app.db.session.commit()
+            app.backfill_credentials(app.db.engine)
+        if args.methods == "sha256":
+            app.password_hasher.needs_rehash = lambda stored_hash: False
+
+    bodies = [{"email": f"login{i}@bench.edu", "password": "secret"} for i in range(accounts)]
+    result = run_load(app.app, ["/api/auth/login"], args.threads, args.requests, method="POST", bodies=bodies)
+    print(json.dumps(result))
+
+
+def login_benchmark(args):
+    print(f"{'method':>8} {'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6} {'errors':>6}")
+    for method in args.methods.split(","):
+        for workers in args.workers.split(","):
+            if method == "sha256" and workers != args.workers.split(",")[0]:
+                continue  # legacy hashes are checked inline, the worker count doesn't matter
+            directory = tempfile.mkdtemp(prefix="club_login_")
+            env = {"DATABASE_URL": f"sqlite:///{directory}/login.db", "HASH_WORKERS": workers,
+                   "PASSWORD_HASH_METHOD": "scrypt" if method == "sha256" else method}
+            r = spawn("_login", env, ["--methods", method, "--threads", str(args.threads),
+                                      "--requests", str(args.requests)])
+            print(f"{method:>8} {workers:>7} {r['throughput']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+                  f"{r['busy']:>6} {r['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("pool", "_pool"):
+        sub = commands.add_parser(name)
+        sub.add_argument("--settings", default="2:0,5:5,10:10",
+                         help="Comma separated pool_size:max_overflow[:pool_timeout] combinations")
+        sub.add_argument("--threads", type=int, default=32)
+        sub.add_argument("--requests", type=int, default=3000)
+
+    sub = commands.add_parser("formats")
+    sub.add_argument("--rows", type=int, default=5000, help="Clubs, members and events to seed")
+    sub.add_argument("--repeat", type=int, default=20, help="Requests per endpoint and format")
+
+    for name in ("tenants", "_tenants"):
+        sub = commands.add_parser(name)
+        sub.add_argument("--tenants", type=int, default=4, help="Tenant databases; the first one is the noisy one")
+        sub.add_argument("--threads", type=int, default=8, help="Threads per tenant")
+        sub.add_argument("--requests", type=int, default=1000, help="Requests per quiet tenant")
+        sub.add_argument("--rows", type=int, default=5000, help="Rows seeded into the noisy tenant")
+
+    sub = commands.add_parser("activity")
+    sub.add_argument("--threads", type=int, default=8)
+    sub.add_argument("--hits", type=int, default=200000, help="Total counter increments")
+    sub.add_argument("--clubs", type=int, default=5, help="Club IDs 1..N to spread hits over (must exist)")
+
+    for name in ("login", "_login"):
+        sub = commands.add_parser(name)
+        sub.add_argument("--methods", default="sha256,scrypt",
+                         help="Comma separated hash methods; sha256 is the legacy unsalted hash")
+        sub.add_argument("--workers", default="1,4", help="Comma separated HASH_WORKERS values")
+        sub.add_argument("--threads", type=int, default=32)
+        sub.add_argument("--requests", type=int, default=400)
+
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        # One scratch database per benchmark so seeded rows don't skew the others
+        path = os.path.join(tempfile.gettempdir(), f"club_benchmark_{args.command.strip('_')}.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    commands = {"pool": pool_benchmark, "_pool": pool_worker, "formats": formats_benchmark,
+                "tenants": tenants_benchmark, "_tenants": tenants_worker, "activity": activity_benchmark,
+                "login": login_benchmark, "_login": login_worker}
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
+import { apiFetch } from '@/lib/api';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:5000/api';
 
@@ -50,7 +51,7 @@ export default function BookmarksPage() {
 
   const fetchBookmarks = async (studentID: number) => {
     try {
-      const response = await fetch(`${API_URL}/students/${studentID}/bookmarks`);
+      const response = await apiFetch(`${API_URL}/students/${studentID}/bookmarks`);
       if (!response.ok) throw new Error('Failed to fetch bookmarks');
       const data = await response.json();
 
@@ -58,7 +59,7 @@ export default function BookmarksPage() {
       const bookmarksWithClubs = await Promise.all(
         data.map(async (bookmark: Bookmark) => {
           try {
-            const clubResponse = await fetch(`${API_URL}/clubs/${bookmark.clubID}`);
+            const clubResponse = await apiFetch(`${API_URL}/clubs/${bookmark.clubID}`);
             if (clubResponse.ok) {
               const club = await clubResponse.json();
               return { ...bookmark, club };
@@ -82,7 +83,7 @@ export default function BookmarksPage() {
     if (!user || !user.studentID) return;
 
     try {
-      const response = await fetch(`${API_URL}/students/${user.studentID}/bookmarks/${clubID}`, {
+      const response = await apiFetch(`${API_URL}/students/${user.studentID}/bookmarks/${clubID}`, {
         method: 'DELETE',
       });
 
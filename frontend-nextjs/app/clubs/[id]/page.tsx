@@ -3,6 +3,7 @@
 import { useState, useEffect } from 'react';
 import { useRouter, useParams } from 'next/navigation';
 import Link from 'next/link';
+import { apiFetch } from '@/lib/api';
 
 const API_URL = 'http://localhost:5001/api';
 
@@ -16,7 +17,7 @@ type Club = {
 };
 
 type Event = {
-  eventID: number;
+  eventID: number | string; // "s<seriesID>-<date>" for recurring meetings
   clubID: number;
   description: string;
   eventDate: string;
@@ -69,27 +70,27 @@ export default function ClubDetailPage() {
     const fetchClubDetails = async () => {
       try {
         // Fetch club info
-        const clubResponse = await fetch(`${API_URL}/clubs/${clubID}`);
+        const clubResponse = await apiFetch(`${API_URL}/clubs/${clubID}`);
         if (!clubResponse.ok) throw new Error('Club not found');
         const clubData = await clubResponse.json();
         setClub(clubData);
 
         // Fetch events for this club
-        const eventsResponse = await fetch(`${API_URL}/clubs/${clubID}/events`);
+        const eventsResponse = await apiFetch(`${API_URL}/clubs/${clubID}/events`);
         if (eventsResponse.ok) {
           const eventsData = await eventsResponse.json();
           setEvents(eventsData);
         }
 
         // Fetch media for this club
-        const mediaResponse = await fetch(`${API_URL}/clubs/${clubID}/media`);
+        const mediaResponse = await apiFetch(`${API_URL}/clubs/${clubID}/media`);
         if (mediaResponse.ok) {
           const mediaData = await mediaResponse.json();
           setMedia(mediaData);
         }
 
         // Fetch members for this club
-        const membersResponse = await fetch(`${API_URL}/clubs/${clubID}/members`);
+        const membersResponse = await apiFetch(`${API_URL}/clubs/${clubID}/members`);
         if (membersResponse.ok) {
           const membersData = await membersResponse.json();
           setMembers(membersData);
@@ -97,14 +98,14 @@ export default function ClubDetailPage() {
 
         // Check if bookmarked (if user is logged in)
         if (user && user.studentID) {
-          const bookmarksResponse = await fetch(`${API_URL}/students/${user.studentID}/bookmarks`);
+          const bookmarksResponse = await apiFetch(`${API_URL}/students/${user.studentID}/bookmarks`);
           if (bookmarksResponse.ok) {
             const bookmarks = await bookmarksResponse.json();
             setIsBookmarked(bookmarks.some((b: any) => b.clubID === parseInt(clubID)));
           }
 
           // Check if member
-          const memberCheckResponse = await fetch(`${API_URL}/clubs/${clubID}/members`);
+          const memberCheckResponse = await apiFetch(`${API_URL}/clubs/${clubID}/members`);
           if (memberCheckResponse.ok) {
             const membersData = await memberCheckResponse.json();
             setIsMember(membersData.some((m: Member) => m.studentID === user.studentID));
@@ -129,13 +130,13 @@ export default function ClubDetailPage() {
     try {
       if (isBookmarked) {
         // Remove bookmark
-        await fetch(`${API_URL}/students/${user.studentID}/bookmarks/${clubID}`, {
+        await apiFetch(`${API_URL}/students/${user.studentID}/bookmarks/${clubID}`, {
           method: 'DELETE',
         });
         setIsBookmarked(false);
       } else {
         // Add bookmark
-        await fetch(`${API_URL}/students/${user.studentID}/bookmarks`, {
+        await apiFetch(`${API_URL}/students/${user.studentID}/bookmarks`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ clubID: parseInt(clubID) }),
@@ -158,7 +159,7 @@ export default function ClubDetailPage() {
         // Leave club
         const member = members.find((m) => m.studentID === user.studentID);
         if (member) {
-          await fetch(`${API_URL}/clubs/${clubID}/members/${member.memberID}`, {
+          await apiFetch(`${API_URL}/clubs/${clubID}/members/${member.memberID}`, {
             method: 'DELETE',
           });
           setIsMember(false);
@@ -166,7 +167,7 @@ export default function ClubDetailPage() {
         }
       } else {
         // Join club
-        const response = await fetch(`${API_URL}/clubs/${clubID}/members`, {
+        const response = await apiFetch(`${API_URL}/clubs/${clubID}/members`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ studentID: user.studentID }),
@@ -174,7 +175,7 @@ export default function ClubDetailPage() {
         if (response.ok) {
           setIsMember(true);
           // Refresh members list
-          const membersResponse = await fetch(`${API_URL}/clubs/${clubID}/members`);
+          const membersResponse = await apiFetch(`${API_URL}/clubs/${clubID}/members`);
           if (membersResponse.ok) {
             const membersData = await membersResponse.json();
             setMembers(membersData);
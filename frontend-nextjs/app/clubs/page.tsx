@@ -3,6 +3,7 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
+import { apiFetch } from '@/lib/api';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:5000/api';
 
@@ -39,7 +40,7 @@ export default function ClubsPage() {
 
   const fetchClubs = async () => {
     try {
-      const response = await fetch(`${API_URL}/clubs`);
+      const response = await apiFetch(`${API_URL}/clubs`);
       if (!response.ok) throw new Error('Failed to fetch clubs');
       const data = await response.json();
       setClubs(data);
@@ -3,11 +3,12 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
+import { apiFetch } from '@/lib/api';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:5000/api';
 
 type Event = {
-  eventID: number;
+  eventID: number | string; // "s<seriesID>-<date>" for recurring meetings
   clubID: number;
   description: string;
   eventDate: string;
@@ -43,13 +44,13 @@ export default function EventsPage() {
   const fetchEventsAndClubs = async () => {
     try {
       // Fetch events
-      const eventsResponse = await fetch(`${API_URL}/events`);
+      const eventsResponse = await apiFetch(`${API_URL}/events`);
       if (!eventsResponse.ok) throw new Error('Failed to fetch events');
       const eventsData = await eventsResponse.json();
       setEvents(eventsData);
 
       // Fetch clubs
-      const clubsResponse = await fetch(`${API_URL}/clubs`);
+      const clubsResponse = await apiFetch(`${API_URL}/clubs`);
       if (clubsResponse.ok) {
         const clubsData = await clubsResponse.json();
         const clubsMap: { [key: number]: Club } = {};
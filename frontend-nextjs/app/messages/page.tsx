@@ -3,6 +3,7 @@
 import { useState, useEffect } from 'react';
 import { useRouter, useSearchParams } from 'next/navigation';
 import Link from 'next/link';
+import { apiFetch } from '@/lib/api';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:5000/api';
 
@@ -72,7 +73,7 @@ export default function MessagesPage() {
       const userType = userData.studentID ? 'student' : 'club';
       const userID = userData.studentID || userData.clubID;
       
-      const response = await fetch(
+      const response = await apiFetch(
         `${API_URL}/messages/${userType}/${userID}?otherID=${otherID}&otherType=${otherType}`
       );
       
@@ -94,7 +95,7 @@ export default function MessagesPage() {
       const userType = user.studentID ? 'student' : 'club';
       const userID = user.studentID || user.clubID;
 
-      const response = await fetch(`${API_URL}/messages`, {
+      const response = await apiFetch(`${API_URL}/messages`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
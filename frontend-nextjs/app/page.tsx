@@ -3,9 +3,10 @@
 import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import { useRouter } from 'next/navigation';
+import { apiFetch } from '@/lib/api';
 
 type Event = {
-  eventID: number;
+  eventID: number | string; // "s<seriesID>-<date>" for recurring meetings
   clubID: number;
   clubName: string;
   description: string;
@@ -56,7 +57,7 @@ export default function HomePage() {
     const fetchClubs = async () => {
       try {
         console.log('Fetching clubs from:', `${API_URL}/clubs`);
-        const response = await fetch(`${API_URL}/clubs`);
+        const response = await apiFetch(`${API_URL}/clubs`);
         console.log('Clubs response status:', response.status);
         if (!response.ok) throw new Error('Failed to fetch clubs');
         const data = await response.json();
@@ -76,7 +77,7 @@ export default function HomePage() {
     const fetchEvents = async () => {
       try {
         console.log('Fetching events from:', `${API_URL}/events`);
-        const response = await fetch(`${API_URL}/events`);
+        const response = await apiFetch(`${API_URL}/events`);
         console.log('Events response status:', response.status);
         if (!response.ok) throw new Error('Failed to fetch events');
         const data = await response.json();
@@ -3,6 +3,7 @@
 import { useState } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
+import { apiFetch } from '@/lib/api';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://127.0.0.1:5000/api';
 
@@ -32,7 +33,7 @@ export default function StudentRegisterPage() {
     setLoading(true);
 
     try {
-      const response = await fetch(`${API_URL}/auth/register/student`, {
+      const response = await apiFetch(`${API_URL}/auth/register/student`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
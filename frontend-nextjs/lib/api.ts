@@ -0,0 +1,20 @@
+// After a write the backend returns X-Primary-Until. Sending it back on later
+// requests keeps our reads on the primary database (not a lagging read
+// replica) until then, so pages show the change we just made.
+const PRIMARY_PIN_HEADER = 'X-Primary-Until';
+
+export async function apiFetch(input: string, init: RequestInit = {}): Promise<Response> {
+  const headers = new Headers(init.headers);
+  const primaryUntil = typeof window !== 'undefined' ? sessionStorage.getItem(PRIMARY_PIN_HEADER) : null;
+  if (primaryUntil) {
+    headers.set(PRIMARY_PIN_HEADER, primaryUntil);
+  }
+
+  const response = await fetch(input, { ...init, headers });
+
+  const pin = response.headers.get(PRIMARY_PIN_HEADER);
+  if (pin && typeof window !== 'undefined') {
+    sessionStorage.setItem(PRIMARY_PIN_HEADER, pin);
+  }
+  return response;
+}